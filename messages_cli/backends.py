@@ -6,13 +6,21 @@ backends (or a specific one) through the registry.
 
 from __future__ import annotations
 
-import asyncio
 import atexit
+import functools
+import heapq
+import itertools
+import os
 from abc import ABC, abstractmethod
+from operator import itemgetter
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-from . import db, send, telegram_send, whatsapp_db, whatsapp_send, messenger_api
-from .utils import format_phone
+from . import db, send, whatsapp_db, whatsapp_send, messenger_api
+from .utils import format_phone, format_phones
+
+if TYPE_CHECKING:
+    import asyncio
 
 
 # ---------------------------------------------------------------------------
@@ -57,11 +65,33 @@ class BackendAdapter(ABC):
     def resolve_display_name(self, identifier: str) -> str:
         return identifier
 
+    def recent_chats_unresolved(self, limit: int) -> list[dict]:
+        """Like recent_chats, but may defer costly display fields.
+
+        Rows must carry "last_message" so they can be merged; anything else
+        is filled in by finalize_chats once the merged top-k is known.
+        """
+        return self.recent_chats(limit)
+
+    def finalize_chats(self, rows: list[dict]) -> None:
+        """Fill in display fields deferred by recent_chats_unresolved, in place."""
+
 
 # ---------------------------------------------------------------------------
 # iMessage
 # ---------------------------------------------------------------------------
 
+# Auto-detect asks has_chat() and then read/search/send for the same string
+@functools.lru_cache(maxsize=512)
+def _resolve_and_find(identifier: str) -> tuple[str | None, str]:
+    return db.resolve_and_find(identifier)
+
+
+@functools.lru_cache(maxsize=512)
+def _resolve_identifier(identifier: str) -> str:
+    return db.resolve_identifier(identifier)
+
+
 class IMessageAdapter(BackendAdapter):
     name = "messages"
     display_name = "Messages"
@@ -70,83 +100,106 @@ class IMessageAdapter(BackendAdapter):
         return db.MESSAGES_DB.exists()
 
     def _display_name_for_chat(self, row: dict) -> str:
-        cid = row["chat_identifier"]
-        if row["display_name"]:
-            return row["display_name"]
-        if cid.startswith("chat"):
-            conn = db._connect_messages()
-            participants = db._get_chat_participants(conn, cid)
-            conn.close()
-            if participants:
-                name = ", ".join(format_phone(p) for p in participants[:3])
-                if len(participants) > 3:
-                    name += f" +{len(participants) - 3}"
-                return name
-            return format_phone(cid)
-        cache = db._build_contact_cache([cid])
-        return cache.get(cid, "") or format_phone(cid)
+        return self._display_names_for_chats([row])[0]
+
+    def _display_names_for_chats(self, rows: list[dict]) -> list[str]:
+        """Resolve display names for many chats with one connection and query."""
+        unnamed = [r["chat_identifier"] for r in rows if not r["display_name"]]
+        group_ids = [cid for cid in unnamed if cid.startswith("chat")]
+        participants: dict[str, list[str]] = {}
+        if group_ids:
+            participants = db._get_chat_participants_bulk(db._get_shared_conn(), group_ids)
+        handles = {h for hs in participants.values() for h in hs}
+        handles.update(cid for cid in unnamed if not cid.startswith("chat"))
+        cache = db._build_contact_cache(list(handles))
+        names = []
+        for r in rows:
+            cid = r["chat_identifier"]
+            if r["display_name"]:
+                names.append(r["display_name"])
+            elif cid.startswith("chat"):
+                people = [cache.get(h, h) for h in participants.get(cid, [])]
+                if people:
+                    name = ", ".join(format_phone(p) for p in people[:3])
+                    if len(people) > 3:
+                        name += f" +{len(people) - 3}"
+                    names.append(name)
+                else:
+                    names.append(format_phone(cid))
+            else:
+                names.append(cache.get(cid, "") or format_phone(cid))
+        return names
 
     def recent_chats(self, limit: int) -> list[dict]:
+        rows = self.recent_chats_unresolved(limit)
+        self.finalize_chats(rows)
+        return rows
+
+    def recent_chats_unresolved(self, limit: int) -> list[dict]:
         return [{
-            "name": self._display_name_for_chat(r),
             "id": r["chat_identifier"],
             "platform": self.name,
             "last_message": r["last_message"],
-            "phone": format_phone(r["chat_identifier"]) if not r["chat_identifier"].startswith("chat") else "",
             "username": "",
             "message_count": r.get("message_count"),
+            "_row": r,
         } for r in db.recent_chats(limit)]
 
+    def finalize_chats(self, rows: list[dict]) -> None:
+        raw = [r.pop("_row") for r in rows]
+        for r, name in zip(rows, self._display_names_for_chats(raw)):
+            cid = r["id"]
+            r["name"] = name
+            r["phone"] = format_phone(cid) if not cid.startswith("chat") else ""
+
     def find_chats(self, query: str) -> list[dict]:
+        rows = db.find_chats(query)
         return [{
-            "name": self._display_name_for_chat(r),
+            "name": name,
             "id": r["chat_identifier"],
             "platform": self.name,
             "phone": format_phone(r["chat_identifier"]) if not r["chat_identifier"].startswith("chat") else "",
             "username": "",
-        } for r in db.find_chats(query)]
+        } for r, name in zip(rows, self._display_names_for_chats(rows))]
 
     def has_chat(self, identifier: str) -> bool:
-        if db.find_chats(identifier):
-            return True
-        return db.resolve_identifier(identifier) != identifier
+        chat_id, resolved = _resolve_and_find(identifier)
+        return chat_id is not None or resolved != identifier
 
     def read_messages(self, identifier: str, limit: int) -> list[dict]:
-        chats = db.find_chats(identifier)
-        if chats:
-            return db.read_messages(chats[0]["chat_identifier"], limit)
-        return db.read_messages(db.resolve_identifier(identifier), limit)
+        _, resolved = _resolve_and_find(identifier)
+        return db.read_messages(resolved, limit)
 
     def search_messages(self, query: str, limit: int, chat_id: str | None = None) -> list[dict]:
-        resolved = None
-        if chat_id:
-            chats = db.find_chats(chat_id)
-            resolved = chats[0]["chat_identifier"] if chats else db.resolve_identifier(chat_id)
+        resolved = _resolve_and_find(chat_id)[1] if chat_id else None
+        rows = db.search_messages(query, limit, chat_id=resolved)
+        phones = format_phones(
+            v for r in rows for v in (r["chat_identifier"], r["sender"]) if v != "Me"
+        )
         return [{
             "timestamp": r["timestamp"],
             "chat_id": r["chat_identifier"],
-            "chat_name": r["display_name"] or format_phone(r["chat_identifier"]),
-            "sender": r["sender"] if r["sender"] == "Me" else format_phone(r["sender"]),
+            "chat_name": r["display_name"] or phones[r["chat_identifier"]],
+            "sender": r["sender"] if r["sender"] == "Me" else phones[r["sender"]],
             "text": r["text"],
             "is_from_me": r.get("is_from_me", r["sender"] == "Me"),
             "platform": self.name,
-        } for r in db.search_messages(query, limit, chat_id=resolved)]
+        } for r in rows]
 
     def stats(self) -> dict:
-        conn = db._connect_messages()
-        msg_count = conn.execute("SELECT COUNT(*) FROM message").fetchone()[0]
-        chat_count = conn.execute("SELECT COUNT(*) FROM chat").fetchone()[0]
-        conn.close()
+        msg_count, chat_count = db._get_shared_conn().execute(
+            "SELECT (SELECT COUNT(*) FROM message), (SELECT COUNT(*) FROM chat)"
+        ).fetchone()
         return {"platform": self.name, "messages": msg_count, "chats": chat_count}
 
     def can_send(self) -> bool:
         return True
 
     def send_message(self, identifier: str, text: str) -> str:
-        return send.send_message(db.resolve_identifier(identifier), text)
+        return send.send_message(_resolve_identifier(identifier), text)
 
     def resolve_display_name(self, identifier: str) -> str:
-        return format_phone(db.resolve_identifier(identifier))
+        return format_phone(_resolve_identifier(identifier))
 
 
 # ---------------------------------------------------------------------------
@@ -165,6 +218,24 @@ def _get_telegram_db():
     return _telegram_db_instance
 
 
+_event_loop: asyncio.AbstractEventLoop | None = None
+
+
+def _run_async(coro):
+    """Run a coroutine on a process-wide event loop instead of asyncio.run()."""
+    global _event_loop
+    if _event_loop is None:
+        try:
+            # libuv-backed loop; cuts socket overhead for Telethon's MTProto traffic
+            import uvloop
+            _event_loop = uvloop.new_event_loop()
+        except ImportError:
+            import asyncio
+            _event_loop = asyncio.new_event_loop()
+        atexit.register(_event_loop.close)
+    return _event_loop.run_until_complete(coro)
+
+
 class TelegramAdapter(BackendAdapter):
     name = "telegram"
     display_name = "Telegram"
@@ -174,9 +245,15 @@ class TelegramAdapter(BackendAdapter):
     def is_available(self) -> bool:
         for variant in ("appstore", ""):
             base = self._TG_CONTAINER / variant if variant else self._TG_CONTAINER
-            for account_dir in base.glob("account-*"):
-                if (account_dir / "postbox/db/db_sqlite").exists():
-                    return True
+            try:
+                with os.scandir(base) as entries:
+                    for entry in entries:
+                        if entry.name.startswith("account-") and os.path.exists(
+                            os.path.join(entry.path, "postbox/db/db_sqlite")
+                        ):
+                            return True
+            except OSError:
+                continue
         return False
 
     def _tdb(self):
@@ -228,7 +305,8 @@ class TelegramAdapter(BackendAdapter):
         return {"platform": self.name, "messages": s["messages"], "chats": s["peers"]}
 
     def can_send(self) -> bool:
-        return telegram_send.is_available()
+        from . import telegram_send
+        return telegram_send.is_logged_in(self._tdb())
 
     def _require_send(self) -> None:
         if not self.can_send():
@@ -237,11 +315,11 @@ class TelegramAdapter(BackendAdapter):
             )
 
     def send_message(self, identifier: str, text: str) -> str:
-        self._require_send()
         peer_id = self._tdb().resolve_identifier(identifier)
         if peer_id is None:
             raise SystemExit(f'Could not find Telegram chat for "{identifier}".')
-        return asyncio.run(telegram_send.send_message(peer_id, text))
+        from . import telegram_send
+        return _run_async(telegram_send.send_message(peer_id, text, self._tdb()))
 
     def resolve_display_name(self, identifier: str) -> str:
         peer_id = self._tdb().resolve_identifier(identifier)
@@ -318,7 +396,6 @@ class WhatsAppAdapter(BackendAdapter):
             )
 
     def send_message(self, identifier: str, text: str) -> str:
-        self._require_send()
         jid = whatsapp_db.resolve_identifier(identifier)
         if jid is None:
             raise SystemExit(f'Could not find WhatsApp chat for "{identifier}".')
@@ -395,7 +472,6 @@ class MessengerAdapter(BackendAdapter):
             )
 
     def send_message(self, identifier: str, text: str) -> str:
-        self._require_send()
         thread_id = messenger_api.resolve_identifier(identifier)
         if thread_id is None:
             raise SystemExit(f'Could not find Messenger chat for "{identifier}".')
@@ -416,18 +492,29 @@ _ALL_BACKENDS = [
 _BACKEND_MAP = {b.name: b for b in _ALL_BACKENDS}
 
 
+@functools.lru_cache(maxsize=None)
+def _is_available(name: str) -> bool:
+    """Probe a single backend once per process."""
+    b = _BACKEND_MAP.get(name)
+    return b is not None and b.is_available()
+
+
+@functools.lru_cache(maxsize=1)
+def _available() -> tuple[str, ...]:
+    """Names of available backends, probed once per process."""
+    return tuple(b.name for b in _ALL_BACKENDS if _is_available(b.name))
+
+
 def _get_backends(platform: str | None = None) -> list[BackendAdapter]:
     if platform:
-        b = _BACKEND_MAP.get(platform)
-        return [b] if b and b.is_available() else []
-    return [b for b in _ALL_BACKENDS if b.is_available()]
+        return [_BACKEND_MAP[platform]] if _is_available(platform) else []
+    return [_BACKEND_MAP[name] for name in _available()]
 
 
 def _get_backend(platform: str) -> BackendAdapter:
-    b = _BACKEND_MAP.get(platform)
-    if b is None or not b.is_available():
+    if not _is_available(platform):
         raise SystemExit(f'Platform "{platform}" is not available.')
-    return b
+    return _BACKEND_MAP[platform]
 
 
 def _find_platform(
@@ -448,15 +535,30 @@ def _find_platform(
 
 
 def available_platforms() -> list[str]:
-    return [b.name for b in _ALL_BACKENDS if b.is_available()]
+    return list(_available())
+
+
+def _merge_newest(runs: list[list[dict]], key: str, limit: int) -> list[dict]:
+    """Merge per-backend result lists newest-first and keep the top `limit`.
+
+    Each run is sorted first; backends already return (nearly) ordered rows,
+    so that is a linear pass, and the k-way merge stops after `limit` items.
+    """
+    by_key = itemgetter(key)
+    runs = [sorted(run, key=by_key, reverse=True) for run in runs]
+    merged = heapq.merge(*runs, key=by_key, reverse=True)
+    return list(itertools.islice(merged, limit))
 
 
 def recent_chats(limit: int, platform: str | None = None) -> list[dict]:
-    results = []
-    for b in _get_backends(platform):
-        results.extend(b.recent_chats(limit))
-    results.sort(key=lambda x: x["last_message"], reverse=True)
-    return results[:limit]
+    runs = [b.recent_chats_unresolved(limit) for b in _get_backends(platform)]
+    results = _merge_newest(runs, "last_message", limit)
+    # Only resolve names/phones for rows that survived the merge
+    for name, b in _BACKEND_MAP.items():
+        kept = [r for r in results if r["platform"] == name]
+        if kept:
+            b.finalize_chats(kept)
+    return results
 
 
 def find_chats(query: str, platform: str | None = None) -> list[dict]:
@@ -478,11 +580,8 @@ def read_messages(
 def search_messages(
     query: str, limit: int, platform: str | None = None, chat: str | None = None,
 ) -> list[dict]:
-    results = []
-    for b in _get_backends(platform):
-        results.extend(b.search_messages(query, limit, chat_id=chat))
-    results.sort(key=lambda x: x["timestamp"], reverse=True)
-    return results[:limit]
+    runs = [b.search_messages(query, limit, chat_id=chat) for b in _get_backends(platform)]
+    return _merge_newest(runs, "timestamp", limit)
 
 
 def stats(platform: str | None = None) -> list[dict]:
@@ -494,7 +593,9 @@ def send_message(
 ) -> tuple[str, str]:
     if platform:
         b = _get_backend(platform)
+        b._require_send()
         return b.name, b.send_message(identifier, text)
+    # _find_platform already filtered on can_send()
     b = _find_platform(identifier, _get_backends(), require_send=True)
     if b is None:
         raise SystemExit(f'Could not find "{identifier}" on any platform.')
@@ -1,11 +1,13 @@
 """CLI entry point for messages-cli."""
 
+import functools
+import re
 from datetime import datetime as _datetime
 
 import click
 
 from . import db, send, backends, whatsapp_auth, messenger_auth
-from .utils import format_phone
+from .utils import format_phone, format_phones
 
 # Colors
 DIM = "bright_black"
@@ -23,23 +25,61 @@ PLATFORM_TAGS = {
 }
 
 VALID_PLATFORMS = ("messages", "telegram", "whatsapp", "messenger")
+_VALID_PLATFORMS_SET = frozenset(VALID_PLATFORMS)
+
+# Bracketed tags are classified by the regex itself: every alternative spans
+# from "[" to the first "]", and the named group that matched picks the color.
+_TAG_RE = re.compile(
+    r"(?P<attachment>\[(?:image|video|audio|file):[^\]]*\])"
+    r"|(?P<reaction>\[(?:Loved|Liked|Disliked|Laughed|Emphasized|Questioned)[^\]]*\])"
+    r"|(?P<edited>\[edited\])"
+    r"|(?P<dim>\[\.\.\.\])"
+    r"|\[[^\]]*\]"
+)
+_TAG_COLORS = {
+    "attachment": ATTACHMENT,
+    "reaction": REACTION,
+    "edited": EDITED,
+    "dim": DIM,
+}
+
+
+def _ansi_codes(**styles) -> tuple[str, str]:
+    """Return the (prefix, suffix) escape codes click.style emits for styles."""
+    prefix, suffix = click.style("\0", **styles).split("\0")
+    return prefix, suffix
+
+
+# Escape codes are built once; click.echo still strips them when not a tty.
+_TAG_STYLES = {group: _ansi_codes(fg=color) for group, color in _TAG_COLORS.items()}
+_DIM_CODES = _ansi_codes(fg=DIM)
+_BOLD_CODES = _ansi_codes(bold=True)
+_SENDER_ME_CODES = _ansi_codes(fg=SENDER_ME)
+_SENDER_OTHER_CODES = _ansi_codes(fg=SENDER_OTHER)
+_EDITED_SUFFIX = click.style(" [edited]", fg=EDITED)
+
+
+def _paint(text: str, codes: tuple[str, str]) -> str:
+    """Wrap text in precomputed escape codes (a cheap click.style)."""
+    return f"{codes[0]}{text}{codes[1]}"
 
 
 def _truncate(text: str, full: bool) -> str:
     if full:
         return text
-    first_line = text.split("\n")[0]
+    first_line, sep, _ = text.partition("\n")
     if len(first_line) > 120:
         return first_line[:117] + "..."
-    if "\n" in text:
+    if sep:
         return first_line + " [...]"
     return first_line
 
 
+@functools.lru_cache(maxsize=8)
 def _platform_tag(platform: str) -> str:
     """Return a dim [im] or [tg] tag."""
     tag = PLATFORM_TAGS.get(platform, platform[:2])
-    return click.style(f"[{tag}]", fg=DIM)
+    return _paint(f"[{tag}]", _DIM_CODES)
 
 
 def _display_ts(ts: str) -> str:
@@ -52,59 +92,74 @@ def _display_ts(ts: str) -> str:
 
 
 def _validate_platform(ctx, param, value):
-    if value is not None and value not in VALID_PLATFORMS:
+    if value is not None and value not in _VALID_PLATFORMS_SET:
         raise click.BadParameter(f"must be one of: {', '.join(VALID_PLATFORMS)}")
     return value
 
 
+_PLATFORM_OPT = click.option(
+    "--platform", "-p", default=None, callback=_validate_platform,
+    expose_value=True, is_eager=False,
+    help="Filter by platform (imessage, telegram).",
+)
+
+
 def platform_option(fn):
     """Decorator adding --platform/-p to a command."""
-    return click.option(
-        "--platform", "-p", default=None, callback=_validate_platform,
-        expose_value=True, is_eager=False,
-        help="Filter by platform (imessage, telegram).",
-    )(fn)
+    return _PLATFORM_OPT(fn)
+
+
+def _style_tag(match: re.Match) -> str:
+    # Every _TAG_RE alternative is a named group, so lastgroup is always set
+    style = _TAG_STYLES.get(match.lastgroup or "")
+    if style is None:
+        return match.group(0)
+    return style[0] + match.group(0) + style[1]
 
 
 def _format_message(m: dict, full: bool) -> str:
-    ts = click.style(_display_ts(m["timestamp"]), fg=DIM)
-    is_me = m["sender"] == "Me"
-    sender_text = m["sender"] if is_me else format_phone(m["sender"])
-    sender = click.style(sender_text, fg=SENDER_ME if is_me else SENDER_OTHER)
+    ts = _paint(_display_ts(m["timestamp"]), _DIM_CODES)
+    sender_id = m["sender"]
+    is_me = sender_id == "Me"
+    sender_text = sender_id if is_me else format_phone(sender_id)
+    sender = _paint(sender_text, _SENDER_ME_CODES if is_me else _SENDER_OTHER_CODES)
     if m.get("edited"):
-        sender += click.style(" [edited]", fg=EDITED)
+        sender += _EDITED_SUFFIX
 
     text = _truncate(m["text"], full)
     # Colorize attachment and reaction tags
-    parts = []
-    i = 0
-    while i < len(text):
-        bracket_start = text.find("[", i)
-        if bracket_start < 0:
-            parts.append(text[i:])
-            break
-        parts.append(text[i:bracket_start])
-        bracket_end = text.find("]", bracket_start)
-        if bracket_end < 0:
-            parts.append(text[bracket_start:])
-            break
-        tag = text[bracket_start:bracket_end + 1]
-        if tag.startswith("[image:") or tag.startswith("[video:") or tag.startswith("[audio:") or tag.startswith("[file:"):
-            parts.append(click.style(tag, fg=ATTACHMENT))
-        elif tag.startswith("[Loved") or tag.startswith("[Liked") or tag.startswith("[Disliked") or tag.startswith("[Laughed") or tag.startswith("[Emphasized") or tag.startswith("[Questioned"):
-            parts.append(click.style(tag, fg=REACTION))
-        elif tag == "[edited]":
-            parts.append(click.style(tag, fg=EDITED))
-        elif tag == "[...]":
-            parts.append(click.style(tag, fg=DIM))
-        else:
-            parts.append(tag)
-        i = bracket_end + 1
-    text = "".join(parts)
+    if "[" in text:
+        text = _TAG_RE.sub(_style_tag, text)
 
     return f"{ts}  {sender}  {text}"
 
 
+def _format_search_row(r: dict, phones: dict[str, str], full: bool, show_tags: bool) -> str:
+    ts = _paint(_display_ts(r["timestamp"]), _DIM_CODES)
+    chat_col = _paint(r["chat_name"], _SENDER_OTHER_CODES)
+    sender_id = r["sender"]
+    if sender_id == "Me":
+        sender = _paint("Me", _SENDER_ME_CODES)
+    else:
+        sender = _paint(phones[sender_id], _SENDER_OTHER_CODES)
+    text = _truncate(r["text"], full)
+    tag = f"  {_platform_tag(r['platform'])}" if show_tags else ""
+    return f"{ts}  {chat_col}  {sender}  {text}{tag}"
+
+
+def _chat_extras(r: dict, show_tags: bool) -> str:
+    """Render the trailing tag/username/phone columns of a chat row."""
+    extras = []
+    if show_tags:
+        extras.append(_platform_tag(r["platform"]))
+    if r["username"]:
+        extras.append(_paint(f"@{r['username']}", _DIM_CODES))
+    if r["phone"] and r["name"] != r["phone"]:
+        extras.append(_paint(r["phone"], _DIM_CODES))
+    extra = "  ".join(extras)
+    return f"  {extra}" if extra else ""
+
+
 @click.group()
 def cli():
     """Unified CLI for all your messaging apps."""
@@ -129,12 +184,11 @@ def contacts_search(name: str):
     for c in results:
         first = c["first"] or ""
         last = c["last"] or ""
-        name_str = click.style(f"{first} {last}".strip(), bold=True)
-        click.echo(name_str)
+        click.echo(_paint(f"{first} {last}".strip(), _BOLD_CODES))
         for phone in c["phones"]:
-            click.echo(f"  {click.style('phone:', fg=DIM)} {format_phone(phone)}")
+            click.echo(f"  {_paint('phone:', _DIM_CODES)} {format_phone(phone)}")
         for email in c["emails"]:
-            click.echo(f"  {click.style('email:', fg=DIM)} {email}")
+            click.echo(f"  {_paint('email:', _DIM_CODES)} {email}")
 
 
 # --- chats ---
@@ -155,21 +209,18 @@ def chats_recent(limit: int, platform: str | None):
         click.echo("No chats found.")
         return
     show_tags = platform is None
-    name_width = max(len(r["name"]) for r in rows)
+    # Single pass: pre-render everything but the padded name column
+    name_width = 0
+    prepared = []
     for r in rows:
-        name_col = click.style(r["name"].ljust(name_width), bold=True)
-        ts_col = click.style(_display_ts(r["last_message"]), fg=DIM)
-        extras = []
-        if show_tags:
-            extras.append(_platform_tag(r["platform"]))
-        if r["username"]:
-            extras.append(click.style(f"@{r['username']}", fg=DIM))
-        if r["phone"] and r["name"] != r["phone"]:
-            extras.append(click.style(r["phone"], fg=DIM))
-        extra = "  ".join(extras)
-        if extra:
-            extra = "  " + extra
-        click.echo(f"{name_col}  {ts_col}{extra}")
+        name = r["name"]
+        if len(name) > name_width:
+            name_width = len(name)
+        ts_col = _paint(_display_ts(r["last_message"]), _DIM_CODES)
+        prepared.append((name, f"  {ts_col}{_chat_extras(r, show_tags)}"))
+    click.echo("\n".join(
+        f"{_paint(name.ljust(name_width), _BOLD_CODES)}{rest}" for name, rest in prepared
+    ))
 
 
 @chats.command("find")
@@ -182,20 +233,16 @@ def chats_find(query: str, platform: str | None):
         click.echo("No chats found.")
         return
     show_tags = platform is None
-    name_width = max(len(r["name"]) for r in rows)
+    name_width = 0
+    prepared = []
     for r in rows:
-        name_col = click.style(r["name"].ljust(name_width), bold=True)
-        extras = []
-        if show_tags:
-            extras.append(_platform_tag(r["platform"]))
-        if r["username"]:
-            extras.append(click.style(f"@{r['username']}", fg=DIM))
-        if r["phone"] and r["name"] != r["phone"]:
-            extras.append(click.style(r["phone"], fg=DIM))
-        extra = "  ".join(extras)
-        if extra:
-            extra = "  " + extra
-        click.echo(f"{name_col}{extra}")
+        name = r["name"]
+        if len(name) > name_width:
+            name_width = len(name)
+        prepared.append((name, _chat_extras(r, show_tags)))
+    click.echo("\n".join(
+        f"{_paint(name.ljust(name_width), _BOLD_CODES)}{rest}" for name, rest in prepared
+    ))
 
 
 # --- read ---
@@ -212,8 +259,7 @@ def read_cmd(identifier: str, limit: int, full: bool, platform: str | None):
     if not messages:
         click.echo("No messages found.")
         return
-    for m in reversed(messages):
-        click.echo(_format_message(m, full))
+    click.echo("\n".join(_format_message(m, full) for m in reversed(messages)))
 
 
 # --- search ---
@@ -235,14 +281,8 @@ def search_cmd(query: str, limit: int, full: bool, chat: str | None, context: in
     show_tags = platform is None
 
     if context <= 0:
-        for r in results:
-            ts = click.style(_display_ts(r["timestamp"]), fg=DIM)
-            chat_col = click.style(r["chat_name"], fg=SENDER_OTHER)
-            sender_text = r["sender"] if r["sender"] == "Me" else format_phone(r["sender"])
-            sender = click.style(sender_text, fg=SENDER_ME if r["sender"] == "Me" else SENDER_OTHER)
-            text = _truncate(r["text"], full)
-            tag = f"  {_platform_tag(r['platform'])}" if show_tags else ""
-            click.echo(f"{ts}  {chat_col}  {sender}  {text}{tag}")
+        phones = format_phones(r["sender"] for r in results)
+        click.echo("\n".join(_format_search_row(r, phones, full, show_tags) for r in results))
         return
 
     # Context mode: fetch surrounding messages for each hit
@@ -250,7 +290,7 @@ def search_cmd(query: str, limit: int, full: bool, chat: str | None, context: in
         if i > 0:
             click.echo()
         tag = f" {_platform_tag(r['platform'])}" if show_tags else ""
-        click.echo(click.style(f"--- {r['chat_name']}{tag} ---", fg=DIM))
+        click.echo(_paint(f"--- {r['chat_name']}{tag} ---", _DIM_CODES))
 
         chat_msgs = backends.read_messages(r["chat_id"], context * 2 + 50, r["platform"])
         # Messages come newest-first; reverse to chronological
@@ -314,7 +354,7 @@ def stats_cmd(platform: str | None):
         click.echo("No platforms available.")
         return
     for r in rows:
-        label = click.style(r["platform"], bold=True)
+        label = _paint(r["platform"], _BOLD_CODES)
         click.echo(f"{label}  Messages: {r['messages']:,}  Chats: {r['chats']:,}")
 
 
@@ -1,8 +1,11 @@
 """SQLite queries for Messages and Contacts databases."""
 
+import atexit
+import functools
 import re
 import sqlite3
 import sys
+from collections import defaultdict
 from pathlib import Path
 
 from .utils import format_ts
@@ -13,6 +16,22 @@ CONTACTS_DIR = Path.home() / "Library" / "Application Support" / "AddressBook" /
 # CoreData epoch: seconds between 1970-01-01 and 2001-01-01
 COREDATA_EPOCH = 978307200
 
+# Control characters and U+FFFC (object replacement) dropped from message text
+_CTRL_TABLE = dict.fromkeys(
+    [*range(0x00, 0x09), 0x0B, 0x0C, *range(0x0E, 0x20), *range(0x7F, 0xA0), 0xFFFC]
+)
+
+TAPBACK_TYPES = {
+    2000: "Loved", 2001: "Liked", 2002: "Disliked",
+    2003: "Laughed at", 2004: "Emphasized", 2005: "Questioned",
+}
+_TAPBACK_PREFIX_RE = re.compile(r"^(?:Loved|Liked|Disliked|Laughed at|Emphasized|Questioned) ")
+
+_END_MARKERS = (b"NSDictionary", b"NSAttributes", b"NSMutableString", b"NSObject")
+_ASCII_DIGITS = frozenset("0123456789")
+_DIGIT_RE = re.compile(r"\d")
+_NON_DIGIT_RE = re.compile(r"\D")
+
 
 def _ts_expr(col: str = "m.date") -> str:
     """SQL expression to convert Apple nanosecond timestamp to unix seconds."""
@@ -21,7 +40,7 @@ def _ts_expr(col: str = "m.date") -> str:
 
 def _connect_messages() -> sqlite3.Connection:
     try:
-        conn = sqlite3.connect(str(MESSAGES_DB))
+        conn = sqlite3.connect(f"{MESSAGES_DB.as_uri()}?mode=ro", uri=True)
         conn.execute("SELECT 1 FROM message LIMIT 1")
     except sqlite3.OperationalError:
         print(
@@ -35,40 +54,102 @@ def _connect_messages() -> sqlite3.Connection:
     return conn
 
 
+_shared_conn: sqlite3.Connection | None = None
+
+
+def _get_shared_conn() -> sqlite3.Connection:
+    """Return a process-wide Messages connection, opened on first use."""
+    global _shared_conn
+    if _shared_conn is None:
+        _shared_conn = _connect_messages()
+        atexit.register(_shared_conn.close)
+    return _shared_conn
+
+
+@functools.lru_cache(maxsize=1)
+def _abcd_sources() -> tuple[Path, ...]:
+    """AddressBook databases under CONTACTS_DIR, discovered once per process."""
+    try:
+        sources = list(CONTACTS_DIR.iterdir()) if CONTACTS_DIR.exists() else []
+    except PermissionError:
+        return ()
+    return tuple(
+        db_path for db_path in (s / "AddressBook-v22.abcddb" for s in sources)
+        if db_path.exists()
+    )
+
+
+_contacts_conns: dict[Path, sqlite3.Connection] = {}
+
+
+def _get_contacts_conn(db_path: Path) -> sqlite3.Connection:
+    """Return a cached read-only connection to an AddressBook database."""
+    conn = _contacts_conns.get(db_path)
+    if conn is None:
+        conn = sqlite3.connect(f"{db_path.as_uri()}?mode=ro", uri=True)
+        conn.row_factory = sqlite3.Row
+        _contacts_conns[db_path] = conn
+        if len(_contacts_conns) == 1:
+            atexit.register(_close_contacts_conns)
+    return conn
+
+
+def _close_contacts_conns() -> None:
+    for conn in _contacts_conns.values():
+        conn.close()
+    _contacts_conns.clear()
+
+
 def extract_attributed_body(blob: bytes | None) -> str | None:
     """Extract text from an attributedBody NSKeyedArchiver blob."""
     if not blob:
         return None
     try:
-        text = blob.split(b"NSString")[1]
-        start = text.find(b"+")
-        if start < 0:
+        # Work on offsets into the blob; only the final text is copied out
+        pos = blob.find(b"NSString")
+        if pos < 0:
+            return None
+        seg_start = pos + len(b"NSString")
+        seg_end = blob.find(b"NSString", seg_start)
+        if seg_end < 0:
+            seg_end = len(blob)
+        plus = blob.find(b"+", seg_start, seg_end)
+        if plus < 0:
             return None
         # Skip the length-prefix byte(s) after '+'
-        raw = text[start + 2 :]
-        # Find end marker — try several NSKeyedArchiver class names
+        start = min(plus + 2, seg_end)
+        # Find end marker — try several NSKeyedArchiver class names. Once one
+        # is found, later markers only need to be searched for before it.
         end = -1
-        for marker in (b"NSDictionary", b"NSAttributes", b"NSMutableString", b"NSObject"):
-            pos = raw.find(marker)
-            if pos >= 0 and (end < 0 or pos < end):
+        for marker in _END_MARKERS:
+            limit = seg_end if end < 0 else min(seg_end, end + len(marker) - 1)
+            pos = blob.find(marker, start, limit)
+            if pos >= 0:
                 end = pos
         if end < 0:
-            end = min(len(raw), 2000)
-        content = raw[:end].decode("utf-8", errors="replace").strip()
-        content = re.sub(r"[\x00-\x08\x0b\x0c\x0e-\x1f\x7f-\x9f\ufffc]", "", content)
-        # Strip trailing binary garbage (replacement chars + stray bytes)
-        content = re.sub(r"[\ufffd].*$", "", content).strip()
+            end = min(seg_end, start + 2000)
+        content = blob[start:end].decode("utf-8", errors="replace").strip()
+        content = content.translate(_CTRL_TABLE)
+        # Strip trailing binary garbage: cut at the first U+FFFD on the last line
+        cut = content.find("\ufffd", content.rfind("\n", 0, len(content) - 1) + 1)
+        if cut >= 0:
+            content = content[:cut]
+        content = content.strip()
         return content or None
     except Exception:
         return None
 
 
 def _has_digits(s: str) -> bool:
-    return bool(re.search(r"\d", s))
+    if not _ASCII_DIGITS.isdisjoint(s):
+        return True
+    # Only non-ASCII text can still hold a (Unicode) digit
+    return not s.isascii() and _DIGIT_RE.search(s) is not None
 
 
+@functools.lru_cache(maxsize=128)
 def _find_chat_by_display_name(name: str) -> str | None:
-    conn = _connect_messages()
+    conn = _get_shared_conn()
     row = conn.execute(
         f"""
         SELECT c.chat_identifier
@@ -82,7 +163,6 @@ def _find_chat_by_display_name(name: str) -> str | None:
         """,
         (f"%{name}%",),
     ).fetchone()
-    conn.close()
     return row["chat_identifier"] if row else None
 
 
@@ -90,7 +170,25 @@ def resolve_identifier(identifier: str) -> str:
     if _has_digits(identifier):
         return identifier
     # Find all matching chats (DM and group)
+    return _resolve_name(identifier, find_chats(identifier))
+
+
+def resolve_and_find(identifier: str) -> tuple[str | None, str]:
+    """Find the best chat for an identifier in one pass.
+
+    Returns (chat_identifier, resolved): the first matching chat (or None),
+    and the identifier to read from -- that chat, or the contact's phone.
+    """
     chats = find_chats(identifier)
+    if chats:
+        chat_id = chats[0]["chat_identifier"]
+        return chat_id, chat_id
+    if _has_digits(identifier):
+        return None, identifier
+    return None, _resolve_name(identifier, chats)
+
+
+def _resolve_name(identifier: str, chats: list[dict]) -> str:
     if chats:
         if len(chats) == 1:
             return chats[0]["chat_identifier"]
@@ -118,19 +216,19 @@ def search_contacts(name: str) -> list[dict]:
 
     Returns deduplicated list: one entry per person with all phones and emails.
     """
+    return [
+        dict(c, phones=list(c["phones"]), emails=list(c["emails"]))
+        for c in _search_contacts(name)
+    ]
+
+
+@functools.lru_cache(maxsize=128)
+def _search_contacts(name: str) -> tuple[dict, ...]:
     # Collect per-person data keyed by (first, last)
     people: dict[tuple, dict] = {}
-    try:
-        sources = list(CONTACTS_DIR.iterdir()) if CONTACTS_DIR.exists() else []
-    except PermissionError:
-        return []
-    for source in sources:
-        db_path = source / "AddressBook-v22.abcddb"
-        if not db_path.exists():
-            continue
+    for db_path in _abcd_sources():
         try:
-            conn = sqlite3.connect(str(db_path))
-            conn.row_factory = sqlite3.Row
+            conn = _get_contacts_conn(db_path)
             rows = conn.execute(
                 """
                 SELECT ZABCDRECORD.Z_PK, ZFIRSTNAME, ZLASTNAME, ZFULLNUMBER, ZADDRESS
@@ -140,9 +238,9 @@ def search_contacts(name: str) -> list[dict]:
                 WHERE ZFIRSTNAME LIKE ? OR ZLASTNAME LIKE ?
                 """,
                 (f"%{name}%", f"%{name}%"),
-            ).fetchall()
+            )
             for r in rows:
-                key = (str(source), r["Z_PK"])
+                key = (db_path, r["Z_PK"])
                 if key not in people:
                     people[key] = {
                         "first": r["ZFIRSTNAME"],
@@ -154,10 +252,9 @@ def search_contacts(name: str) -> list[dict]:
                     people[key]["phones"].add(r["ZFULLNUMBER"])
                 if r["ZADDRESS"]:
                     people[key]["emails"].add(r["ZADDRESS"])
-            conn.close()
         except Exception:
             continue
-    return [
+    return tuple(
         {
             "first": p["first"],
             "last": p["last"],
@@ -165,28 +262,35 @@ def search_contacts(name: str) -> list[dict]:
             "emails": sorted(p["emails"]),
         }
         for p in people.values()
-    ]
+    )
 
 
-def _get_chat_participants(conn: sqlite3.Connection, chat_identifier: str) -> list[str]:
+def _get_chat_participants_bulk(
+    conn: sqlite3.Connection, chat_identifiers: list[str],
+) -> dict[str, list[str]]:
+    """Fetch participant handles for many chats in a single query."""
+    if not chat_identifiers:
+        return {}
+    placeholders = ",".join("?" * len(chat_identifiers))
     rows = conn.execute(
-        """
-        SELECT h.id
+        f"""
+        SELECT c.chat_identifier, h.id
         FROM handle h
         JOIN chat_handle_join chj ON h.ROWID = chj.handle_id
         JOIN chat c ON chj.chat_id = c.ROWID
-        WHERE c.chat_identifier = ?
+        WHERE c.chat_identifier IN ({placeholders})
         """,
-        (chat_identifier,),
-    ).fetchall()
-    handles = [r["id"] for r in rows]
-    cache = _build_contact_cache(handles)
-    return [cache.get(h, h) for h in handles]
+        chat_identifiers,
+    )
+    participants: dict[str, list[str]] = {}
+    for r in rows:
+        participants.setdefault(r["chat_identifier"], []).append(r["id"])
+    return participants
 
 
 def recent_chats(limit: int = 20) -> list[dict]:
     """List recent chats with last message time."""
-    conn = _connect_messages()
+    conn = _get_shared_conn()
     rows = conn.execute(
         f"""
         SELECT c.chat_identifier, c.display_name,
@@ -200,8 +304,7 @@ def recent_chats(limit: int = 20) -> list[dict]:
         LIMIT ?
         """,
         (limit,),
-    ).fetchall()
-    conn.close()
+    )
     return [{
         "chat_identifier": r["chat_identifier"],
         "display_name": r["display_name"],
@@ -212,103 +315,114 @@ def recent_chats(limit: int = 20) -> list[dict]:
 
 def find_chats(identifier: str) -> list[dict]:
     """Find DM and group chats by phone digits, identifier, or contact name."""
-    digits = re.sub(r"\D", "", identifier)
-    if not digits:
-        # No digits — treat as a name, resolve to phone numbers via contacts
-        contacts = search_contacts(identifier)
-        if contacts:
-            all_results = []
-            seen = set()
-            for c in contacts:
-                for phone in c["phones"]:
-                    for r in find_chats(phone):
-                        if r["ROWID"] not in seen:
-                            seen.add(r["ROWID"])
-                            all_results.append(r)
-            return all_results
-        digits = identifier
-    conn = _connect_messages()
-    # DM chats
-    dm_rows = conn.execute(
-        """
-        SELECT c.chat_identifier, c.display_name, c.ROWID
-        FROM chat c
-        WHERE c.chat_identifier LIKE ?
-        """,
-        (f"%{digits}%",),
-    ).fetchall()
-    # Group chats containing this person
-    group_rows = conn.execute(
-        """
-        SELECT c.chat_identifier, c.display_name, c.ROWID
-        FROM chat c
-        JOIN chat_handle_join chj ON c.ROWID = chj.chat_id
-        JOIN handle h ON chj.handle_id = h.ROWID
-        WHERE h.id LIKE ?
-        GROUP BY c.ROWID
+    digits = _NON_DIGIT_RE.sub("", identifier)
+    if digits:
+        return _find_chats_matching([digits])
+    # No digits — treat as a name, resolve to phone numbers via contacts
+    contacts = search_contacts(identifier)
+    if contacts:
+        terms = [_NON_DIGIT_RE.sub("", p) or p for c in contacts for p in c["phones"]]
+        return _find_chats_matching(terms) if terms else []
+    return _find_chats_matching([identifier])
+
+
+def _find_chats_matching(terms: list[str]) -> list[dict]:
+    """Find chats whose identifier or participants contain any term.
+
+    Results are ordered by term, DM chats before group chats, each chat once.
+    """
+    terms = list(dict.fromkeys(terms))
+    values = ",".join(f"({i}, ?)" for i in range(len(terms)))
+    rows = _get_shared_conn().execute(
+        f"""
+        WITH wanted(idx, pattern) AS (VALUES {values}),
+        hits(rank, chat_identifier, display_name, chat_rowid) AS (
+            SELECT w.idx * 2, c.chat_identifier, c.display_name, c.ROWID
+            FROM wanted w
+            JOIN chat c ON c.chat_identifier LIKE w.pattern
+            UNION ALL
+            SELECT w.idx * 2 + 1, c.chat_identifier, c.display_name, c.ROWID
+            FROM wanted w
+            JOIN handle h ON h.id LIKE w.pattern
+            JOIN chat_handle_join chj ON chj.handle_id = h.ROWID
+            JOIN chat c ON c.ROWID = chj.chat_id
+        )
+        SELECT chat_identifier, display_name, chat_rowid AS ROWID
+        FROM hits
+        GROUP BY chat_rowid
+        ORDER BY MIN(rank), chat_rowid
         """,
-        (f"%{digits}%",),
-    ).fetchall()
-    conn.close()
-    seen = set()
-    results = []
-    for r in list(dm_rows) + list(group_rows):
-        rid = r["ROWID"]
-        if rid not in seen:
-            seen.add(rid)
-            results.append(dict(r))
-    return results
-
-
-def _resolve_handle_to_name(handle: str) -> str | None:
-    digits = re.sub(r"\D", "", handle)
-    if not digits:
-        return None
-    pattern = f"%{digits[-10:]}%"
-    try:
-        sources = list(CONTACTS_DIR.iterdir()) if CONTACTS_DIR.exists() else []
-    except PermissionError:
-        return None
-    for source in sources:
-        db_path = source / "AddressBook-v22.abcddb"
-        if not db_path.exists():
-            continue
-        try:
-            conn = sqlite3.connect(str(db_path))
-            conn.row_factory = sqlite3.Row
-            row = conn.execute(
-                """
-                SELECT ZFIRSTNAME, ZLASTNAME
-                FROM ZABCDRECORD
-                JOIN ZABCDPHONENUMBER ON ZABCDRECORD.Z_PK = ZABCDPHONENUMBER.ZOWNER
-                WHERE REPLACE(REPLACE(REPLACE(REPLACE(ZFULLNUMBER, ' ', ''), '-', ''), '(', ''), ')', '') LIKE ?
-                LIMIT 1
-                """,
-                (pattern,),
-            ).fetchone()
-            conn.close()
-            if row:
-                first = row["ZFIRSTNAME"] or ""
-                last = row["ZLASTNAME"] or ""
-                name = f"{first} {last}".strip()
-                if name:
-                    return name
-        except Exception:
-            continue
-    return None
+        [f"%{t}%" for t in terms],
+    )
+    return [dict(r) for r in rows]
+
+
+# Handles per contacts query; two bound parameters each, well under SQLite's limit
+_CONTACT_BATCH = 400
+
+
+# Handle -> contact name (None when unmatched), kept for the life of the process
+_contact_names: dict[str, str | None] = {}
 
 
 def _build_contact_cache(handles: list[str]) -> dict[str, str]:
-    cache = {}
+    new = [h for h in dict.fromkeys(handles) if h not in _contact_names]
+    if new:
+        found = _query_contact_names(new)
+        for handle in new:
+            _contact_names[handle] = found.get(handle)
+    return {h: n for h in handles if (n := _contact_names[h])}
+
+
+def _query_contact_names(handles: list[str]) -> dict[str, str]:
+    """Resolve handles to contact names, one query per AddressBook source."""
+    patterns = {}
     for handle in handles:
-        name = _resolve_handle_to_name(handle)
-        if name:
-            cache[handle] = name
+        digits = _NON_DIGIT_RE.sub("", handle)
+        if digits:
+            patterns[handle] = f"%{digits[-10:]}%"
+    cache: dict[str, str] = {}
+    if not patterns:
+        return cache
+    for db_path in _abcd_sources():
+        pending = [h for h in patterns if h not in cache]
+        if not pending:
+            break
+        try:
+            conn = _get_contacts_conn(db_path)
+            for i in range(0, len(pending), _CONTACT_BATCH):
+                batch = pending[i : i + _CONTACT_BATCH]
+                values = ",".join(["(?, ?)"] * len(batch))
+                rows = conn.execute(
+                    f"""
+                    WITH wanted(handle, pattern) AS (VALUES {values})
+                    SELECT wanted.handle, ZFIRSTNAME, ZLASTNAME
+                    FROM wanted
+                    JOIN ZABCDPHONENUMBER
+                      ON REPLACE(REPLACE(REPLACE(REPLACE(ZFULLNUMBER, ' ', ''), '-', ''), '(', ''), ')', '') LIKE wanted.pattern
+                    JOIN ZABCDRECORD ON ZABCDRECORD.Z_PK = ZABCDPHONENUMBER.ZOWNER
+                    """,
+                    [v for h in batch for v in (h, patterns[h])],
+                )
+                # First match per handle wins; an unnamed match defers to later sources
+                matched = set()
+                for r in rows:
+                    handle = r["handle"]
+                    if handle in matched:
+                        continue
+                    matched.add(handle)
+                    first = r["ZFIRSTNAME"] or ""
+                    last = r["ZLASTNAME"] or ""
+                    name = f"{first} {last}".strip()
+                    if name:
+                        cache[handle] = name
+        except Exception:
+            continue
     return cache
 
 
 def read_messages(chat_id: str, limit: int = 20) -> list[dict]:
-    conn = _connect_messages()
+    conn = _get_shared_conn()
     rows = conn.execute(
         f"""
         SELECT {_ts_expr()} as timestamp,
@@ -324,6 +438,7 @@ def read_messages(chat_id: str, limit: int = 20) -> list[dict]:
         JOIN chat c ON cmj.chat_id = c.ROWID
         LEFT JOIN handle h ON m.handle_id = h.ROWID
         WHERE c.chat_identifier = ?
+          AND COALESCE(m.associated_message_type, 0) < 3000
         ORDER BY m.date DESC
         LIMIT ?
         """,
@@ -332,8 +447,8 @@ def read_messages(chat_id: str, limit: int = 20) -> list[dict]:
 
     # Get attachments for these messages
     message_ids = [r["message_id"] for r in rows]
-    attachment_map: dict[int, list[str]] = {}
-    image_paths_map: dict[int, list[str]] = {}
+    attachment_map: defaultdict[int, list[str]] = defaultdict(list)
+    image_paths_map: defaultdict[int, list[str]] = defaultdict(list)
     if message_ids:
         placeholders = ",".join("?" * len(message_ids))
         att_rows = conn.execute(
@@ -342,49 +457,40 @@ def read_messages(chat_id: str, limit: int = 20) -> list[dict]:
             FROM message_attachment_join maj
             JOIN attachment a ON maj.attachment_id = a.ROWID
             WHERE maj.message_id IN ({placeholders})
+              AND instr(COALESCE(NULLIF(a.transfer_name, ''), NULLIF(a.filename, ''), ''),
+                        'pluginPayloadAttachment') = 0
             """,
             message_ids,
-        ).fetchall()
+        )
         for a in att_rows:
             mid = a["message_id"]
             name = a["transfer_name"] or a["filename"] or "attachment"
-            if "pluginPayloadAttachment" in name:
-                continue
             mime = a["mime_type"] or ""
             label = mime.split("/")[0] if "/" in mime else "file"
-            attachment_map.setdefault(mid, []).append(f"[{label}: {name}]")
+            attachment_map[mid].append(f"[{label}: {name}]")
             if mime.startswith("image/") and a["filename"]:
                 resolved = Path(a["filename"]).expanduser()
                 if resolved.exists():
-                    image_paths_map.setdefault(mid, []).append(str(resolved))
-
-    conn.close()
-
-    TAPBACK_TYPES = {
-        2000: "Loved", 2001: "Liked", 2002: "Disliked",
-        2003: "Laughed at", 2004: "Emphasized", 2005: "Questioned",
-    }
+                    image_paths_map[mid].append(str(resolved))
 
     # Resolve phone numbers to contact names
     handles = {r["handle"] for r in rows if r["handle"] and not r["is_from_me"]}
     name_cache = _build_contact_cache(list(handles))
+    # DMs have a single other participant: resolve it once, outside the loop
+    dm_handle = next(iter(handles)) if len(handles) == 1 else None
+    dm_name = name_cache.get(dm_handle, dm_handle) if dm_handle else None
 
     messages = []
     for r in rows:
         assoc_type = r["associated_message_type"] or 0
 
         # Tapback reactions
-        if assoc_type in TAPBACK_TYPES:
-            reaction = TAPBACK_TYPES[assoc_type]
+        reaction = TAPBACK_TYPES.get(assoc_type)
+        if reaction:
             body = r["text"] or extract_attributed_body(r["attributedBody"]) or ""
             # Strip redundant reaction prefix from body (e.g. 'Loved "msg"' -> '"msg"')
-            for prefix in ("Loved ", "Liked ", "Disliked ", "Laughed at ", "Emphasized ", "Questioned "):
-                if body.startswith(prefix):
-                    body = body[len(prefix):]
-                    break
+            body = _TAPBACK_PREFIX_RE.sub("", body, count=1)
             content = f'[{reaction}] {body}'
-        elif assoc_type >= 3000:
-            continue  # reaction removal, skip
         else:
             content = r["text"] or extract_attributed_body(r["attributedBody"])
             attachments = attachment_map.get(r["message_id"], [])
@@ -398,8 +504,12 @@ def read_messages(chat_id: str, limit: int = 20) -> list[dict]:
         if is_from_me:
             sender = "Me"
         else:
-            handle = r["handle"] or "Unknown"
-            sender = name_cache.get(handle, handle)
+            handle = r["handle"]
+            if handle and handle == dm_handle:
+                sender = dm_name
+            else:
+                handle = handle or "Unknown"
+                sender = name_cache.get(handle, handle)
         edited = r["date_edited"] and r["date_edited"] > 0
         messages.append(
             {
@@ -416,7 +526,7 @@ def read_messages(chat_id: str, limit: int = 20) -> list[dict]:
 
 def search_messages(query: str, limit: int = 20, chat_id: str | None = None) -> list[dict]:
     """Search message content, optionally scoped to a specific chat."""
-    conn = _connect_messages()
+    conn = _get_shared_conn()
     where = "m.text LIKE ?"
     params: list = [f"%{query}%"]
     if chat_id:
@@ -441,12 +551,14 @@ def search_messages(query: str, limit: int = 20, chat_id: str | None = None) ->
         """,
         params,
     ).fetchall()
-    conn.close()
+    # Resolve sender handles to contact names, like read_messages does
+    handles = {r["sender"] for r in rows if r["sender"] and not r["is_from_me"]}
+    name_cache = _build_contact_cache(list(handles))
     return [{
         "timestamp": format_ts(r["timestamp"]),
         "chat_identifier": r["chat_identifier"],
         "display_name": r["display_name"],
-        "sender": r["sender"],
+        "sender": name_cache.get(r["sender"], r["sender"]),
         "is_from_me": bool(r["is_from_me"]),
         "text": r["text"],
     } for r in rows]
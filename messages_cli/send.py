@@ -2,18 +2,22 @@
 
 import subprocess
 
-
-def send_message(phone: str, text: str) -> str:
-    """Send an iMessage to a phone number via Messages.app."""
-    script = f'''
+# Recipient and text arrive as run-handler arguments, never spliced into source
+_SEND_SCRIPT = '''
+on run argv
     tell application "Messages"
-        set targetBuddy to "{phone}"
+        set targetBuddy to item 1 of argv
         set targetService to id of 1st account whose service type = iMessage
-        send "{text}" to participant targetBuddy of account id targetService
+        send (item 2 of argv) to participant targetBuddy of account id targetService
     end tell
-    '''
+end run
+'''
+
+
+def send_message(phone: str, text: str) -> str:
+    """Send an iMessage to a phone number via Messages.app."""
     result = subprocess.run(
-        ["osascript", "-e", script],
+        ["osascript", "-e", _SEND_SCRIPT, phone, text],
         capture_output=True,
         text=True,
     )
@@ -13,8 +13,10 @@ from __future__ import annotations
 
 import binascii
 import enum
-import io
+import hashlib
 import os
+import pickle
+import re
 import sqlite3
 import struct
 import subprocess
@@ -30,8 +32,11 @@ from Crypto.Hash import SHA512
 
 # Telegram App Store container
 _TG_CONTAINER = Path.home() / "Library/Group Containers/6N38VWS5BX.ru.keepcoder.Telegram"
+_PEER_CACHE_DIR = Path.home() / ".cache/messages-cli/telegram"
 _DEFAULT_PASSWORD = "no-matter-key"
 _MURMUR_SEED = -137723950
+_DIGIT_RE = re.compile(r"\d")
+_NON_DIGIT_RE = re.compile(r"\D")
 
 
 def _murmur(data: bytes | str) -> int:
@@ -55,6 +60,26 @@ def _find_db_path() -> Path | None:
     return None
 
 
+def _db_state(db_path: Path) -> tuple[tuple[int, int], ...]:
+    """(mtime_ns, size) of the database and its WAL, for cache invalidation.
+
+    Recent writes sit in the WAL until checkpointed, so it counts too.
+    """
+    state = []
+    for path in (db_path, db_path.with_name(db_path.name + "-wal")):
+        try:
+            st = path.stat()
+        except OSError:
+            continue
+        state.append((st.st_mtime_ns, st.st_size))
+    return tuple(state)
+
+
+def _account_tag(db_path: Path) -> str:
+    """Short stable id for the account a postbox belongs to, for cache names."""
+    return hashlib.blake2b(str(db_path).encode(), digest_size=8).hexdigest()
+
+
 def _find_key_path() -> Path | None:
     """Find the .tempkeyEncrypted file."""
     for variant in ("appstore", ""):
@@ -78,7 +103,7 @@ def _decrypt_key(key_path: Path, password: str = _DEFAULT_PASSWORD) -> tuple[byt
 
     db_key = decrypted[:32]
     db_salt = decrypted[32:48]
-    db_hash = struct.unpack("<i", decrypted[48:52])[0]
+    db_hash = _I32.unpack_from(decrypted, 48)[0]
 
     calc_hash = _murmur(db_key + db_salt)
     if db_hash != calc_hash:
@@ -90,6 +115,33 @@ def _decrypt_key(key_path: Path, password: str = _DEFAULT_PASSWORD) -> tuple[byt
     return db_key, db_salt
 
 
+def _open_encrypted(db_path: Path, db_key: bytes, db_salt: bytes):
+    """Open the encrypted DB in place via the sqlcipher3 binding, if installed.
+
+    Pages are decrypted on demand, so no plaintext copy is written to disk.
+    Returns None when the binding is missing or cannot open the database.
+    """
+    try:
+        import sqlcipher3
+    except ImportError:
+        return None
+
+    hex_key = binascii.hexlify(db_key + db_salt).decode()
+    try:
+        conn = sqlcipher3.connect(f"{db_path.as_uri()}?mode=ro", uri=True)
+    except sqlcipher3.Error:
+        return None
+    try:
+        conn.execute(f"PRAGMA key=\"x'{hex_key}'\"")
+        conn.execute("PRAGMA cipher_plaintext_header_size=32")
+        # The key is only checked once a page is read
+        conn.execute("SELECT count(*) FROM sqlite_master").fetchone()
+    except sqlcipher3.Error:
+        conn.close()
+        return None
+    return conn
+
+
 def _decrypt_database(db_path: Path, db_key: bytes, db_salt: bytes) -> Path:
     """Use sqlcipher CLI to export encrypted DB to a plaintext temp file."""
     hex_key = binascii.hexlify(db_key + db_salt).decode()
@@ -123,57 +175,107 @@ DETACH DATABASE plaintext;
 # PostboxEncoder binary parser
 # ---------------------------------------------------------------------------
 
-class _ByteReader:
-    """Little-endian binary reader."""
+# Precompiled little-endian primitives used by PostboxEncoder values
+_I8 = struct.Struct("<b")
+_U8 = struct.Struct("<B")
+_I32 = struct.Struct("<i")
+_U32 = struct.Struct("<I")
+_I64 = struct.Struct("<q")
+_F64 = struct.Struct("<d")
+# t7 keys are big-endian: peerId(i64) + namespace(i32) + timestamp(i32) + messageId(i32)
+_MESSAGE_KEY = struct.Struct(">qiii")
+_I64_BE = struct.Struct(">q")
+_I32_BE = struct.Struct(">i")
 
-    def __init__(self, data: bytes, endian: str = "<"):
-        self.buf = io.BytesIO(data)
-        self.endian = endian
+# Field names repeat in every blob ("_", "fn", "ln", ...); decode each once
+_FIELD_NAMES: dict[bytes, str] = {}
+_FIELD_NAMES_MAX = 1024
 
-    def _read(self, fmt: str) -> int | float:
-        fmt = self.endian + fmt
-        size = struct.calcsize(fmt)
-        data = self.buf.read(size)
-        if len(data) < size:
+
+class _ByteReader:
+    """Little-endian reader over a memoryview with an integer cursor."""
+
+    def __init__(self, data: bytes):
+        self.mv = memoryview(data)
+        self.pos = 0
+        self.end = len(data)
+
+    def _read(self, st: struct.Struct) -> int | float:
+        pos = self.pos
+        if pos + st.size > self.end:
+            self.pos = self.end
+            raise EOFError("Unexpected end of data")
+        self.pos = pos + st.size
+        return st.unpack_from(self.mv, pos)[0]
+
+    def _advance(self, n: int) -> int:
+        """Move the cursor n bytes (clamped; negative means to the end)."""
+        start = self.pos
+        self.pos = self.end if n < 0 else min(start + n, self.end)
+        return start
+
+    def read(self, n: int) -> bytes:
+        start = self._advance(n)
+        return self.mv[start:self.pos].tobytes()
+
+    def view(self, n: int) -> memoryview:
+        """Like read(), but returns a zero-copy slice of the source buffer."""
+        start = self._advance(n)
+        return self.mv[start:self.pos]
+
+    def skip(self, n: int) -> None:
+        self._advance(n)
+
+    def skip_exact(self, n: int) -> None:
+        """Skip n bytes, raising EOFError like a read would if fewer remain."""
+        if self.pos + n > self.end:
+            self.pos = self.end
             raise EOFError("Unexpected end of data")
-        return struct.unpack(fmt, data)[0]
+        self.pos += n
 
     def read_int8(self) -> int:
-        return self._read("b")
+        return self._read(_I8)
 
     def read_uint8(self) -> int:
-        return self._read("B")
+        return self._read(_U8)
 
     def read_int32(self) -> int:
-        return self._read("i")
+        return self._read(_I32)
 
     def read_uint32(self) -> int:
-        return self._read("I")
+        return self._read(_U32)
 
     def read_int64(self) -> int:
-        return self._read("q")
+        return self._read(_I64)
 
     def read_double(self) -> float:
-        return self._read("d")
+        return self._read(_F64)
 
     def read_bytes(self) -> bytes:
         length = self.read_int32()
-        return self.buf.read(length)
+        return self.read(length)
 
     def read_str(self) -> str:
-        return self.read_bytes().decode("utf-8", errors="replace")
+        length = self.read_int32()
+        return str(self.view(length), "utf-8", "replace")
 
     def read_short_str(self) -> str:
+        raw = self.read_short_str_bytes()
+        name = _FIELD_NAMES.get(raw)
+        if name is None:
+            name = raw.decode("utf-8", errors="replace")
+            if len(_FIELD_NAMES) < _FIELD_NAMES_MAX:
+                _FIELD_NAMES[raw] = name
+        return name
+
+    def read_short_str_bytes(self) -> bytes:
+        """Read a length-prefixed field name without decoding it."""
         length = self.read_uint8()
-        return self.buf.read(length).decode("utf-8", errors="replace")
+        return self.read(length)
 
     @property
     def remaining(self) -> int:
-        pos = self.buf.tell()
-        self.buf.seek(0, io.SEEK_END)
-        end = self.buf.tell()
-        self.buf.seek(pos)
-        return end - pos
+        return self.end - self.pos
 
 
 class _ValueType(enum.Enum):
@@ -193,159 +295,136 @@ class _ValueType(enum.Enum):
     BytesArray = 13
 
 
+def _read_object(r: _ByteReader) -> bytes:
+    _type_hash = r.read_int32()
+    data_len = r.read_int32()
+    return r.read(data_len)
+
+
+def _read_object_dictionary(r: _ByteReader) -> list:
+    count = r.read_int32()
+    for _ in range(count):
+        # key object
+        r.read_int32()
+        klen = r.read_int32()
+        r.skip(klen)
+        # value object
+        r.read_int32()
+        vlen = r.read_int32()
+        r.skip(vlen)
+    return []
+
+
+def _skip_sized(r: _ByteReader):
+    length = r.read_int32()
+    r.skip(length)
+
+
+def _skip_object(r: _ByteReader):
+    r.skip(4)  # type hash
+    data_len = r.read_int32()
+    r.skip(data_len)
+
+
+def _skip_each(skip_one):
+    def skip(r: _ByteReader):
+        count = r.read_int32()
+        for _ in range(count):
+            skip_one(r)
+    return skip
+
+
+def _skip_object_pair(r: _ByteReader):
+    _skip_object(r)
+    _skip_object(r)
+
+
+# Value handlers indexed by the raw type tag, so decoding a value is one
+# table lookup instead of a walk down an if/elif chain of enum compares
+_VALUE_READERS = (
+    (_ValueType.Int32, _ByteReader.read_int32),
+    (_ValueType.Int64, _ByteReader.read_int64),
+    (_ValueType.Bool, lambda r: r.read_uint8() != 0),
+    (_ValueType.Double, _ByteReader.read_double),
+    (_ValueType.String, _ByteReader.read_str),
+    (_ValueType.Object, _read_object),
+    (_ValueType.Int32Array, lambda r: [r.read_int32() for _ in range(r.read_int32())]),
+    (_ValueType.Int64Array, lambda r: [r.read_int64() for _ in range(r.read_int32())]),
+    (_ValueType.ObjectArray, lambda r: [_read_object(r) for _ in range(r.read_int32())]),
+    (_ValueType.ObjectDictionary, _read_object_dictionary),
+    (_ValueType.Bytes, _ByteReader.read_bytes),
+    (_ValueType.Nil, lambda r: None),
+    (_ValueType.StringArray, lambda r: [r.read_str() for _ in range(r.read_int32())]),
+    (_ValueType.BytesArray, lambda r: [r.read_bytes() for _ in range(r.read_int32())]),
+)
+
+_VALUE_SKIPPERS = (
+    lambda r: r.skip(4),                   # Int32
+    lambda r: r.skip(8),                   # Int64
+    lambda r: r.skip(1),                   # Bool
+    lambda r: r.skip(8),                   # Double
+    _skip_sized,                           # String
+    _skip_object,                          # Object
+    lambda r: r.skip(r.read_int32() * 4),  # Int32Array
+    lambda r: r.skip(r.read_int32() * 8),  # Int64Array
+    _skip_each(_skip_object),              # ObjectArray
+    _skip_each(_skip_object_pair),         # ObjectDictionary
+    _skip_sized,                           # Bytes
+    lambda r: None,                        # Nil
+    _skip_each(_skip_sized),               # StringArray
+    _skip_each(_skip_sized),               # BytesArray
+)
+
+
 class _PostboxDecoder:
     """Decoder for Telegram's PostboxEncoder binary format."""
 
     def __init__(self, data: bytes):
         self.reader = _ByteReader(data)
         self.size = len(data)
+        self._fields: dict[str, object] | None = None
+        self._typed: dict[tuple[str, _ValueType], object] = {}
+
+    def _decode(self) -> dict[str, object]:
+        """Walk the blob once, caching values by key and by (key, type)."""
+        if self._fields is None:
+            self._fields = {}
+            self.reader.pos = 0
+            while self.reader.pos < self.size:
+                try:
+                    key = self.reader.read_short_str()
+                    vtype, value = self._read_value()
+                except (EOFError, struct.error, ValueError):
+                    break
+                self._fields[key] = value
+                self._typed.setdefault((key, vtype), value)
+        return self._fields
 
     def decode_all_fields(self) -> dict:
         """Decode all key-value pairs into a dict."""
-        self.reader.buf.seek(0)
-        fields = {}
-        while self.reader.buf.tell() < self.size:
-            try:
-                key = self.reader.read_short_str()
-                _, value = self._read_value()
-                fields[key] = value
-            except (EOFError, struct.error, ValueError):
-                break
-        return fields
+        return dict(self._decode())
 
     def get_string(self, key: str) -> str | None:
         """Find a string field by key."""
-        self.reader.buf.seek(0)
-        while self.reader.buf.tell() < self.size:
-            try:
-                k = self.reader.read_short_str()
-                vtype, value = self._read_value()
-                if k == key and vtype == _ValueType.String:
-                    return value
-            except (EOFError, struct.error, ValueError):
-                break
-        return None
+        self._decode()
+        return self._typed.get((key, _ValueType.String))
 
     def get_int64(self, key: str) -> int | None:
-        self.reader.buf.seek(0)
-        while self.reader.buf.tell() < self.size:
-            try:
-                k = self.reader.read_short_str()
-                vtype, value = self._read_value()
-                if k == key and vtype == _ValueType.Int64:
-                    return value
-            except (EOFError, struct.error, ValueError):
-                break
-        return None
+        self._decode()
+        return self._typed.get((key, _ValueType.Int64))
 
-    def _skip_value(self, vtype: _ValueType):
+    def _skip_value(self, tag: int):
         """Skip over a value without decoding it."""
-        if vtype in (_ValueType.Int32, _ValueType.Int32Array):
-            if vtype == _ValueType.Int32:
-                self.reader.buf.read(4)
-            else:
-                count = self.reader.read_int32()
-                self.reader.buf.read(count * 4)
-        elif vtype in (_ValueType.Int64, _ValueType.Double):
-            self.reader.buf.read(8)
-        elif vtype == _ValueType.Bool:
-            self.reader.buf.read(1)
-        elif vtype in (_ValueType.String, _ValueType.Bytes):
-            length = self.reader.read_int32()
-            self.reader.buf.read(length)
-        elif vtype == _ValueType.Object:
-            self.reader.buf.read(4)  # type hash
-            data_len = self.reader.read_int32()
-            self.reader.buf.read(data_len)
-        elif vtype == _ValueType.Nil:
-            pass
-        elif vtype == _ValueType.ObjectArray:
-            count = self.reader.read_int32()
-            for _ in range(count):
-                self.reader.buf.read(4)  # type hash
-                data_len = self.reader.read_int32()
-                self.reader.buf.read(data_len)
-        elif vtype == _ValueType.Int64Array:
-            count = self.reader.read_int32()
-            self.reader.buf.read(count * 8)
-        elif vtype == _ValueType.StringArray:
-            count = self.reader.read_int32()
-            for _ in range(count):
-                length = self.reader.read_int32()
-                self.reader.buf.read(length)
-        elif vtype == _ValueType.BytesArray:
-            count = self.reader.read_int32()
-            for _ in range(count):
-                length = self.reader.read_int32()
-                self.reader.buf.read(length)
-        elif vtype == _ValueType.ObjectDictionary:
-            count = self.reader.read_int32()
-            for _ in range(count):
-                self.reader.buf.read(4)
-                klen = self.reader.read_int32()
-                self.reader.buf.read(klen)
-                self.reader.buf.read(4)
-                vlen = self.reader.read_int32()
-                self.reader.buf.read(vlen)
+        if tag >= len(_VALUE_SKIPPERS):
+            raise ValueError(f"Unknown value type: {tag}")
+        _VALUE_SKIPPERS[tag](self.reader)
 
     def _read_value(self) -> tuple[_ValueType, object]:
-        vtype = _ValueType(self.reader.read_uint8())
-
-        if vtype == _ValueType.Int32:
-            return vtype, self.reader.read_int32()
-        elif vtype == _ValueType.Int64:
-            return vtype, self.reader.read_int64()
-        elif vtype == _ValueType.Bool:
-            return vtype, self.reader.read_uint8() != 0
-        elif vtype == _ValueType.Double:
-            return vtype, self.reader.read_double()
-        elif vtype == _ValueType.String:
-            return vtype, self.reader.read_str()
-        elif vtype == _ValueType.Object:
-            _type_hash = self.reader.read_int32()
-            data_len = self.reader.read_int32()
-            data = self.reader.buf.read(data_len)
-            return vtype, data
-        elif vtype == _ValueType.Int32Array:
-            count = self.reader.read_int32()
-            return vtype, [self.reader.read_int32() for _ in range(count)]
-        elif vtype == _ValueType.Int64Array:
-            count = self.reader.read_int32()
-            return vtype, [self.reader.read_int64() for _ in range(count)]
-        elif vtype == _ValueType.ObjectArray:
-            count = self.reader.read_int32()
-            items = []
-            for _ in range(count):
-                _type_hash = self.reader.read_int32()
-                data_len = self.reader.read_int32()
-                data = self.reader.buf.read(data_len)
-                items.append(data)
-            return vtype, items
-        elif vtype == _ValueType.ObjectDictionary:
-            count = self.reader.read_int32()
-            items = []
-            for _ in range(count):
-                # key object
-                self.reader.read_int32()
-                klen = self.reader.read_int32()
-                self.reader.buf.read(klen)
-                # value object
-                self.reader.read_int32()
-                vlen = self.reader.read_int32()
-                self.reader.buf.read(vlen)
-            return vtype, items
-        elif vtype == _ValueType.Bytes:
-            return vtype, self.reader.read_bytes()
-        elif vtype == _ValueType.Nil:
-            return vtype, None
-        elif vtype == _ValueType.StringArray:
-            count = self.reader.read_int32()
-            return vtype, [self.reader.read_str() for _ in range(count)]
-        elif vtype == _ValueType.BytesArray:
-            count = self.reader.read_int32()
-            return vtype, [self.reader.read_bytes() for _ in range(count)]
-        else:
-            raise ValueError(f"Unknown value type: {vtype}")
+        tag = self.reader.read_uint8()
+        if tag >= len(_VALUE_READERS):
+            raise ValueError(f"Unknown value type: {tag}")
+        vtype, read = _VALUE_READERS[tag]
+        return vtype, read(self.reader)
 
 
 # ---------------------------------------------------------------------------
@@ -379,19 +458,40 @@ class _FwdInfoFlags(enum.IntFlag):
     Flags = 1 << 5
 
 
+# Bytes taken by each optional fixed-size field, in on-disk order
+_MSG_DATA_SIZES = (
+    (_MessageDataFlags.GloballyUniqueId, 8),
+    (_MessageDataFlags.GlobalTags, 4),
+    (_MessageDataFlags.GroupingKey, 8),
+    (_MessageDataFlags.GroupInfo, 4),
+    (_MessageDataFlags.LocalTags, 4),
+    (_MessageDataFlags.ThreadId, 8),
+)
+# Total bytes to skip, indexed by the raw flags byte
+_MSG_DATA_SKIP = tuple(
+    sum(size for bit, size in _MSG_DATA_SIZES if flags & bit) for flags in range(256)
+)
+_FWD_FIXED_SKIP = {
+    0: 0,
+    _FwdInfoFlags.SourceId: 8,
+    _FwdInfoFlags.SourceMessage: 16,
+    _FwdInfoFlags.SourceId | _FwdInfoFlags.SourceMessage: 24,
+}
+
+
 # ---------------------------------------------------------------------------
 # Message parsing
 # ---------------------------------------------------------------------------
 
-def _parse_message_key(key: bytes) -> dict:
-    """Parse t7 key: peerId(i64) + namespace(i32) + timestamp(i32) + messageId(i32)."""
-    reader = _ByteReader(key, endian=">")
-    return {
-        "peer_id": reader.read_int64(),
-        "namespace": reader.read_int32(),
-        "timestamp": reader.read_int32(),
-        "message_id": reader.read_int32(),
-    }
+def _peer_key_range(peer_id: int) -> tuple[bytes, bytes | None]:
+    """Return [lo, hi) t7 key bounds covering every message of a peer.
+
+    Blobs compare bytewise, so the bound is the next 8-byte prefix taken as
+    unsigned; there is none above ff..ff (peer_id -1).
+    """
+    prefix = _I64_BE.pack(peer_id)
+    nxt = int.from_bytes(prefix, "big") + 1
+    return prefix, nxt.to_bytes(8, "big") if nxt < 1 << 64 else None
 
 
 def _parse_fwd_info(reader: _ByteReader) -> dict | None:
@@ -402,12 +502,8 @@ def _parse_fwd_info(reader: _ByteReader) -> dict | None:
     author_id = reader.read_int64()
     date = reader.read_int32()
 
-    if _FwdInfoFlags.SourceId in info_flags:
-        reader.read_int64()
-    if _FwdInfoFlags.SourceMessage in info_flags:
-        reader.read_int64()  # peer_id
-        reader.read_int32()  # namespace
-        reader.read_int32()  # id
+    # SourceId (i64), SourceMessage (peer_id i64, namespace i32, id i32)
+    reader.skip_exact(_FWD_FIXED_SKIP[info_flags & 0b110])
     if _FwdInfoFlags.Signature in info_flags:
         reader.read_str()
     if _FwdInfoFlags.PsaType in info_flags:
@@ -429,20 +525,8 @@ def _parse_message_value(data: bytes) -> dict | None:
 
         _stable_id = reader.read_uint32()
         _stable_ver = reader.read_uint32()
-        data_flags = _MessageDataFlags(reader.read_uint8())
-
-        if _MessageDataFlags.GloballyUniqueId in data_flags:
-            reader.read_int64()
-        if _MessageDataFlags.GlobalTags in data_flags:
-            reader.read_uint32()
-        if _MessageDataFlags.GroupingKey in data_flags:
-            reader.read_int64()
-        if _MessageDataFlags.GroupInfo in data_flags:
-            reader.read_uint32()
-        if _MessageDataFlags.LocalTags in data_flags:
-            reader.read_uint32()
-        if _MessageDataFlags.ThreadId in data_flags:
-            reader.read_int64()
+        # None of the optional data fields are used; skip them in one step
+        reader.skip_exact(_MSG_DATA_SKIP[reader.read_uint8()])
 
         flags = _MessageFlags(reader.read_uint32())
         tags = reader.read_uint32()
@@ -456,10 +540,9 @@ def _parse_message_value(data: bytes) -> dict | None:
 
         text = reader.read_str()
 
-        # Capture position after text for media parsing
-        post_text_pos = reader.buf.tell()
-        post_text_data = reader.buf.read()
-        reader.buf.seek(post_text_pos)
+        # Keep everything after the text for media parsing, as a view
+        # into the row's value rather than a copy of it
+        post_text_data = reader.mv[reader.pos:]
 
         return {
             "text": text,
@@ -479,7 +562,7 @@ def _parse_message_value(data: bytes) -> dict | None:
 _TG_MEDIA_IMAGE_HASH = 0x8bae2094
 
 
-def _extract_photo_resource_ids(post_text_data: bytes) -> list[int]:
+def _extract_photo_resource_ids(post_text_data: bytes | memoryview) -> list[int]:
     """Extract photo resource IDs from the post-text portion of a message.
 
     After text, the message binary contains:
@@ -498,7 +581,7 @@ def _extract_photo_resource_ids(post_text_data: bytes) -> list[int]:
         attr_count = reader.read_int32()
         for _ in range(attr_count):
             alen = reader.read_int32()
-            reader.buf.read(alen)
+            reader.skip(alen)
 
         # Read media
         media_count = reader.read_int32()
@@ -508,7 +591,7 @@ def _extract_photo_resource_ids(post_text_data: bytes) -> list[int]:
         resource_ids = []
         for _ in range(media_count):
             mlen = reader.read_int32()
-            media_data = reader.buf.read(mlen)
+            media_data = reader.view(mlen)
             rids = _parse_media_image(media_data)
             resource_ids.extend(rids)
 
@@ -517,12 +600,12 @@ def _extract_photo_resource_ids(post_text_data: bytes) -> list[int]:
         return []
 
 
-def _parse_media_image(media_data: bytes) -> list[int]:
+def _parse_media_image(media_data: bytes | memoryview) -> list[int]:
     """Parse a media blob and extract resource IDs if it's a TelegramMediaImage."""
     try:
         mr = _ByteReader(media_data)
         klen = mr.read_uint8()
-        mr.buf.read(klen)  # key (usually "_")
+        mr.skip(klen)  # key (usually "_")
         vtype = mr.read_uint8()
         if vtype != _ValueType.Object.value:
             return []
@@ -530,7 +613,7 @@ def _parse_media_image(media_data: bytes) -> list[int]:
         if type_hash != _TG_MEDIA_IMAGE_HASH:
             return []
         inner_len = mr.read_int32()
-        inner_data = mr.buf.read(inner_len)
+        inner_data = mr.view(inner_len)
 
         inner = _PostboxDecoder(inner_data)
         fields = inner.decode_all_fields()
@@ -564,7 +647,7 @@ def _extract_resource_id_from_rep(rep_bytes: bytes) -> int | None:
         if isinstance(i_val, int):
             return i_val
         if isinstance(i_val, bytes) and len(i_val) == 8:
-            return struct.unpack('<q', i_val)[0]
+            return _I64.unpack(i_val)[0]
         return None
     except (EOFError, struct.error, ValueError):
         return None
@@ -605,6 +688,10 @@ def _build_photo_cache(media_dir: Path) -> dict[int, str]:
 # Peer parsing
 # ---------------------------------------------------------------------------
 
+# Root object key in t2 peer blobs, compared undecoded
+_K_ROOT = b"_"
+
+
 def _parse_peer(data: bytes) -> dict | None:
     """Parse a t2 value blob into a peer info dict.
 
@@ -617,16 +704,16 @@ def _parse_peer(data: bytes) -> dict | None:
     # The outer blob is PostboxEncoder with key "_" -> Object
     # We need to find the Object value for key "_" and parse its inner data
     outer = _PostboxDecoder(data)
-    outer.reader.buf.seek(0)
+    outer.reader.pos = 0
 
     try:
-        while outer.reader.buf.tell() < outer.size:
-            key = outer.reader.read_short_str()
+        while outer.reader.pos < outer.size:
+            key = outer.reader.read_short_str_bytes()
             vtype_raw = outer.reader.read_uint8()
-            if key == "_" and vtype_raw == _ValueType.Object.value:
+            if key == _K_ROOT and vtype_raw == _ValueType.Object.value:
                 _type_hash = outer.reader.read_int32()
                 data_len = outer.reader.read_int32()
-                inner_data = outer.reader.buf.read(data_len)
+                inner_data = outer.reader.view(data_len)
                 inner = _PostboxDecoder(inner_data)
                 fields = inner.decode_all_fields()
                 return {
@@ -638,8 +725,7 @@ def _parse_peer(data: bytes) -> dict | None:
                 }
             else:
                 # Skip this value to continue searching
-                vtype = _ValueType(vtype_raw)
-                outer._skip_value(vtype)
+                outer._skip_value(vtype_raw)
     except (EOFError, struct.error, ValueError):
         pass
 
@@ -671,8 +757,13 @@ class TelegramDB:
         self._db_path = _find_db_path()
         self._key_path = _find_key_path()
         self._conn: sqlite3.Connection | None = None
+        # _db_state() taken just before connecting; the connection's data is
+        # at least this new
+        self._conn_state: tuple | None = None
         self._plaintext_path: Path | None = None
         self._peer_cache: dict[int, dict] = {}
+        self._peers: list[tuple[int, dict]] | None = None
+        self._resolve_cache: dict[str, int | None] = {}
         self._photo_cache: dict[int, str] | None = None
 
     @property
@@ -691,9 +782,18 @@ class TelegramDB:
             )
             sys.exit(1)
 
+        self._conn_state = _db_state(self._db_path)
         db_key, db_salt = _decrypt_key(self._key_path)
-        self._plaintext_path = _decrypt_database(self._db_path, db_key, db_salt)
-        self._conn = sqlite3.connect(str(self._plaintext_path))
+        conn = _open_encrypted(self._db_path, db_key, db_salt)
+        if conn is None:
+            self._plaintext_path = _decrypt_database(self._db_path, db_key, db_salt)
+            # Our private export never changes, so SQLite can skip locking
+            # and journal checks entirely
+            conn = sqlite3.connect(
+                f"{self._plaintext_path.as_uri()}?mode=ro&immutable=1", uri=True
+            )
+        conn.execute("PRAGMA cache_size=-8192")
+        self._conn = conn
 
     def _get_photo_cache(self) -> dict[int, str]:
         if self._photo_cache is None:
@@ -734,10 +834,77 @@ class TelegramDB:
             self._plaintext_path.unlink()
             self._plaintext_path = None
 
+    def _peer_cache_file(self) -> Path | None:
+        """Disk cache path for parsed peers, named after the account and its state.
+
+        The state is the one seen before connecting, so a write racing the
+        connection can only make the snapshot newer than its name says.
+        """
+        if self._db_path is None:
+            return None
+        state = self._conn_state if self._conn is not None else _db_state(self._db_path)
+        if state is None:
+            return None
+        fp = hashlib.blake2b(
+            "|".join(f"{m}:{n}" for m, n in state).encode(), digest_size=16
+        ).hexdigest()
+        return _PEER_CACHE_DIR / f"peers-{_account_tag(self._db_path)}-{fp}.pkl"
+
+    def _load_peers(self, cache_file: Path | None) -> list[tuple[int, dict]] | None:
+        if cache_file is None:
+            return None
+        try:
+            with open(cache_file, "rb") as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+    def _save_peers(self, cache_file: Path | None, peers: list[tuple[int, dict]]):
+        if cache_file is None:
+            return
+        try:
+            # Names and phone numbers from the decrypted database: owner-only
+            _PEER_CACHE_DIR.mkdir(mode=0o700, parents=True, exist_ok=True)
+            os.chmod(_PEER_CACHE_DIR, 0o700)
+            # Only this account's current snapshot is worth keeping
+            account = cache_file.name.rsplit("-", 1)[0]
+            for old in _PEER_CACHE_DIR.glob(f"{account}-*.pkl"):
+                old.unlink(missing_ok=True)
+            tmp = cache_file.with_suffix(".tmp")
+            fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(peers, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, cache_file)
+        except OSError:
+            pass
+
+    def _prime_peer_cache(self) -> list[tuple[int, dict]]:
+        """Parse every t2 peer in one scan; returns the parseable ones in table order.
+
+        The parsed list is persisted under ~/.cache and reused until the
+        Telegram database changes.
+        """
+        if self._peers is None:
+            cache_file = self._peer_cache_file()
+            peers = self._load_peers(cache_file)
+            if peers is None:
+                self._ensure_connection()
+                peers = []
+                for peer_id, value in self._conn.execute("SELECT key, value FROM t2"):
+                    peer = _parse_peer(value)
+                    if peer is not None:
+                        peers.append((peer_id, peer))
+                self._save_peers(cache_file, peers)
+            self._peer_cache.update(peers)
+            self._peers = peers
+        return self._peers
+
     def _get_peer(self, peer_id: int) -> dict:
         if peer_id in self._peer_cache:
             return self._peer_cache[peer_id]
 
+        # Also reached for peers a primed snapshot lacks (added since, or
+        # unparseable); the result is cached either way
         self._ensure_connection()
         row = self._conn.execute(
             "SELECT value FROM t2 WHERE key = ? LIMIT 1", (peer_id,)
@@ -755,18 +922,19 @@ class TelegramDB:
         """List recent chats with peer names and last message time."""
         self._ensure_connection()
 
-        rows = self._conn.execute("SELECT key FROM t7").fetchall()
-
-        # Find the most recent timestamp and message count per peer
+        # Most recent timestamp and message count per peer, aggregated by
+        # SQLite over the raw key bytes. Big-endian timestamps are positive,
+        # so the blob MAX() of bytes 13-16 is the numeric maximum.
+        rows = self._conn.execute(
+            "SELECT substr(key, 1, 8), MAX(substr(key, 13, 4)), COUNT(*) "
+            "FROM t7 GROUP BY substr(key, 1, 8)"
+        ).fetchall()
         peer_latest: dict[int, int] = {}
         peer_count: dict[int, int] = {}
-        for (key,) in rows:
-            parsed = _parse_message_key(key)
-            pid = parsed["peer_id"]
-            ts = parsed["timestamp"]
-            if pid not in peer_latest or ts > peer_latest[pid]:
-                peer_latest[pid] = ts
-            peer_count[pid] = peer_count.get(pid, 0) + 1
+        for pid_bytes, ts_bytes, count in rows:
+            pid = _I64_BE.unpack(pid_bytes)[0]
+            peer_latest[pid] = _I32_BE.unpack(ts_bytes)[0]
+            peer_count[pid] = count
 
         # Sort by most recent timestamp
         sorted_peers = sorted(peer_latest.items(), key=lambda x: x[1], reverse=True)[:limit]
@@ -789,24 +957,16 @@ class TelegramDB:
 
     def find_chats(self, query: str) -> list[dict]:
         """Find chats by name, username, or phone substring."""
-        import re as _re
         self._ensure_connection()
         query_lower = query.lower()
-        query_digits = _re.sub(r"\D", "", query)
-
-        # Get all known peers from t2
-        rows = self._conn.execute("SELECT key, value FROM t2").fetchall()
+        query_digits = _NON_DIGIT_RE.sub("", query)
 
         results = []
-        for peer_id, value in rows:
-            peer = _parse_peer(value)
-            if peer is None:
-                continue
-            self._peer_cache[peer_id] = peer
+        for peer_id, peer in self._prime_peer_cache():
             name = _peer_display_name(peer)
             searchable = f"{name} {peer.get('username', '')} {peer.get('phone', '')}".lower()
             # Match by text substring or by phone digits
-            phone_digits = _re.sub(r"\D", "", peer.get("phone", ""))
+            phone_digits = _NON_DIGIT_RE.sub("", peer.get("phone", ""))
             if query_lower in searchable or (query_digits and query_digits in phone_digits):
                 results.append({
                     "peer_id": peer_id,
@@ -821,30 +981,45 @@ class TelegramDB:
     def find_peer_by_phone(self, phone_digits: str) -> int | None:
         """Find a peer_id by phone number digits."""
         self._ensure_connection()
-        import re
-        digits = re.sub(r"\D", "", phone_digits)
+        digits = _NON_DIGIT_RE.sub("", phone_digits)
         if not digits:
             return None
-        rows = self._conn.execute("SELECT key, value FROM t2").fetchall()
-        for peer_id, value in rows:
-            peer = _parse_peer(value)
-            if peer is None:
-                continue
-            self._peer_cache[peer_id] = peer
-            peer_phone = re.sub(r"\D", "", peer.get("phone", ""))
+        if self._peers is None:
+            # Telegram stores phones as bare digits, so rows that can hold
+            # the number contain it verbatim. Parse only those candidates.
+            for peer_id, value in self._conn.execute(
+                "SELECT key, value FROM t2 WHERE instr(value, ?) > 0",
+                (digits.encode("utf-8"),),
+            ):
+                peer = _parse_peer(value)
+                if peer is None:
+                    continue
+                self._peer_cache[peer_id] = peer
+                peer_phone = _NON_DIGIT_RE.sub("", peer.get("phone", ""))
+                if peer_phone and digits in peer_phone:
+                    return peer_id
+        # Fall back to every peer, for phones stored with formatting
+        for peer_id, peer in self._prime_peer_cache():
+            peer_phone = _NON_DIGIT_RE.sub("", peer.get("phone", ""))
             if peer_phone and digits in peer_phone:
                 return peer_id
         return None
 
     def resolve_identifier(self, identifier: str) -> int | None:
         """Resolve a name, phone, or peer_id string to a peer_id int."""
-        import re
+        if identifier in self._resolve_cache:
+            return self._resolve_cache[identifier]
+        result = self._resolve_identifier(identifier)
+        self._resolve_cache[identifier] = result
+        return result
+
+    def _resolve_identifier(self, identifier: str) -> int | None:
         stripped = identifier.strip()
         # Pure digits and large -> treat as peer_id directly
         if stripped.isdigit() and int(stripped) > 100000:
             return int(stripped)
         # Contains digits -> try phone lookup
-        if re.search(r"\d", stripped):
+        if _DIGIT_RE.search(stripped):
             result = self.find_peer_by_phone(stripped)
             if result is not None:
                 return result
@@ -868,16 +1043,22 @@ class TelegramDB:
         self._ensure_connection()
 
         # Match messages by peer_id prefix (first 8 bytes of the 20-byte key)
-        prefix = struct.pack(">q", peer_id)
-
-        rows = self._conn.execute(
-            "SELECT key, value FROM t7 WHERE substr(key, 1, 8) = ? ORDER BY key DESC LIMIT ?",
-            (prefix, limit),
-        ).fetchall()
+        # as a key range, so SQLite can walk the primary key index
+        lo, hi = _peer_key_range(peer_id)
+        if hi is None:
+            rows = self._conn.execute(
+                "SELECT key, value FROM t7 WHERE key >= ? ORDER BY key DESC LIMIT ?",
+                (lo, limit),
+            )
+        else:
+            rows = self._conn.execute(
+                "SELECT key, value FROM t7 WHERE key >= ? AND key < ? ORDER BY key DESC LIMIT ?",
+                (lo, hi, limit),
+            )
 
         messages = []
         for key, value in rows:
-            idx = _parse_message_key(key)
+            msg_peer, _, timestamp, message_id = _MESSAGE_KEY.unpack_from(key)
             msg = _parse_message_value(value)
             if msg is None:
                 continue
@@ -891,13 +1072,13 @@ class TelegramDB:
 
             # Resolve sender
             if msg["incoming"]:
-                author_id = msg["author_id"] or idx["peer_id"]
+                author_id = msg["author_id"] or msg_peer
                 author_peer = self._get_peer(author_id)
                 sender = _peer_display_name(author_peer)
             else:
                 sender = "Me"
 
-            ts = format_ts(idx["timestamp"])
+            ts = format_ts(timestamp)
 
             messages.append({
                 "timestamp": ts,
@@ -905,8 +1086,8 @@ class TelegramDB:
                 "text": text,
                 "edited": False,
                 "is_from_me": not msg["incoming"],
-                "peer_id": idx["peer_id"],
-                "message_id": idx["message_id"],
+                "peer_id": msg_peer,
+                "message_id": message_id,
                 "image_paths": image_paths,
             })
 
@@ -917,15 +1098,43 @@ class TelegramDB:
         self._ensure_connection()
         query_lower = query.lower()
 
-        rows = self._conn.execute(
-            "SELECT key, value FROM t7 ORDER BY key DESC"
-        ).fetchall()
+        if query.isascii():
+            # Let SQLite drop blobs that cannot contain the text before we
+            # parse anything. lower() folds ASCII only, so also keep blobs
+            # holding the two non-ASCII letters Python lowercases to ASCII
+            # (KELVIN SIGN -> "k", CAPITAL I WITH DOT -> "i\u0307").
+            rows = self._conn.execute(
+                "SELECT key, value FROM t7 "
+                "WHERE instr(CAST(lower(value) AS BLOB), ?) > 0 "
+                "OR instr(value, x'E284AA') > 0 OR instr(value, x'C4B0') > 0 "
+                "ORDER BY key DESC",
+                (query_lower.encode("ascii"),),
+            )
+        elif all(c.lower() == c.upper() for c in query) and not (
+            "\u0307" in query or "\ufffd" in query
+        ):
+            # Caseless text (CJK, emoji, digits) can only match blobs that
+            # hold its UTF-8 bytes verbatim. U+0307 can come from lowering
+            # "\u0130" and U+FFFD from decode errors, so those keep the scan.
+            rows = self._conn.execute(
+                "SELECT key, value FROM t7 WHERE instr(value, ?) > 0 "
+                "ORDER BY key DESC",
+                (query.encode("utf-8"),),
+            )
+        else:
+            rows = self._conn.execute(
+                "SELECT key, value FROM t7 ORDER BY key DESC"
+            )
 
         results = []
         for key, value in rows:
             if len(results) >= limit:
                 break
 
+            msg_peer, _, timestamp, _ = _MESSAGE_KEY.unpack_from(key)
+            if peer_id is not None and msg_peer != peer_id:
+                continue
+
             msg = _parse_message_value(value)
             if msg is None or not msg["text"]:
                 continue
@@ -933,21 +1142,16 @@ class TelegramDB:
             if query_lower not in msg["text"].lower():
                 continue
 
-            idx = _parse_message_key(key)
-
-            if peer_id is not None and idx["peer_id"] != peer_id:
-                continue
-
-            peer = self._get_peer(idx["peer_id"])
+            peer = self._get_peer(msg_peer)
 
             if msg["incoming"]:
-                author_id = msg["author_id"] or idx["peer_id"]
+                author_id = msg["author_id"] or msg_peer
                 author_peer = self._get_peer(author_id)
                 sender = _peer_display_name(author_peer)
             else:
                 sender = "Me"
 
-            ts = format_ts(idx["timestamp"])
+            ts = format_ts(timestamp)
 
             results.append({
                 "timestamp": ts,
@@ -955,7 +1159,7 @@ class TelegramDB:
                 "sender": sender,
                 "text": msg["text"],
                 "is_from_me": not msg["incoming"],
-                "peer_id": idx["peer_id"],
+                "peer_id": msg_peer,
             })
 
         return results
@@ -963,15 +1167,28 @@ class TelegramDB:
     def get_all_messages(self, since_timestamp: int = 0) -> list[dict]:
         """Get all messages, optionally filtered by timestamp. For bulk export."""
         self._ensure_connection()
-
-        rows = self._conn.execute(
-            "SELECT key, value FROM t7 ORDER BY key ASC"
-        ).fetchall()
+        self._prime_peer_cache()
+
+        if since_timestamp > 0:
+            # Let SQLite drop older rows before their values are fetched.
+            # Big-endian bytes of non-negative timestamps compare like the
+            # numbers; x'80000000' and up are negative and never qualify.
+            threshold = _I32_BE.pack(min(since_timestamp, 0x7FFFFFFF))
+            rows = self._conn.execute(
+                "SELECT key, value FROM t7 "
+                "WHERE substr(key, 13, 4) >= ? AND substr(key, 13, 4) < x'80000000' "
+                "ORDER BY key ASC",
+                (threshold,),
+            )
+        else:
+            rows = self._conn.execute(
+                "SELECT key, value FROM t7 ORDER BY key ASC"
+            )
 
         messages = []
         for key, value in rows:
-            idx = _parse_message_key(key)
-            if idx["timestamp"] < since_timestamp:
+            msg_peer, _, timestamp, message_id = _MESSAGE_KEY.unpack_from(key)
+            if timestamp < since_timestamp:
                 continue
 
             msg = _parse_message_value(value)
@@ -980,21 +1197,21 @@ class TelegramDB:
 
             # Resolve sender
             if msg["incoming"]:
-                author_id = msg["author_id"] or idx["peer_id"]
+                author_id = msg["author_id"] or msg_peer
                 author_peer = self._get_peer(author_id)
                 sender_name = _peer_display_name(author_peer)
             else:
                 sender_name = None
 
-            peer = self._get_peer(idx["peer_id"])
+            peer = self._get_peer(msg_peer)
 
             image_paths = self._resolve_image_paths(msg)
 
             messages.append({
-                "peer_id": idx["peer_id"],
+                "peer_id": msg_peer,
                 "peer_name": _peer_display_name(peer),
-                "message_id": idx["message_id"],
-                "timestamp": idx["timestamp"],
+                "message_id": message_id,
+                "timestamp": timestamp,
                 "text": msg["text"],
                 "is_from_me": not msg["incoming"],
                 "sender_name": sender_name,
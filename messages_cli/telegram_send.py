@@ -7,11 +7,21 @@ separate login is needed -- if you're logged into Telegram.app, sending works.
 
 from __future__ import annotations
 
+import asyncio
+import atexit
+import io
+import json
+import os
 import plistlib
+import struct
+from pathlib import Path
+from typing import TYPE_CHECKING, cast
 
-from telethon import TelegramClient
-from telethon.crypto import AuthKey
-from telethon.sessions import MemorySession
+from .telegram_db import TelegramDB, _account_tag, _db_state
+
+# Telethon takes a while to import; only pay for it when actually sending
+if TYPE_CHECKING:
+    from telethon import TelegramClient
 
 # Official macOS Telegram values (public in source)
 _API_ID = 2834
@@ -26,40 +36,158 @@ _DC_ADDRESSES = {
     5: "91.108.56.130",
 }
 
+# peer_id -> [kind, id, access_hash], one file per account: access hashes
+# are stable for an account but mean nothing to another
+_ENTITY_CACHE_DIR = Path.home() / ".cache/messages-cli/telegram"
+_entity_caches: dict[Path, dict[int, list]] = {}
+
+# DC whose key was last found authorized by probing, tried first next time
+_LAST_DC_PATH = Path.home() / ".cache/messages-cli/telegram/last_dc.json"
+
+# peer_id -> "+phone" / "@username" already resolved in this process
+_HINT_CACHE: dict[int, str] = {}
+
+# Requests in flight at once when sending to several chats
+_SEND_CONCURRENCY = 8
+
+# Connected client shared by every send in this process
+_client: TelegramClient | None = None
+_client_lock = asyncio.Lock()
+# Loop the client was connected on; Telethon's client.loop may be another one
+_client_loop: asyncio.AbstractEventLoop | None = None
+
+# (database state, (main_dc_id, {dc_id: auth_key})) from the last extraction
+_AUTH_KEYS_CACHE: tuple[tuple, tuple[int | None, dict[int, bytes]]] | None = None
+_AUTH_INFO_KEY = b"persistent:datacenterAuthInfoById"
+
+
+def _invalidate_auth_cache() -> None:
+    global _AUTH_KEYS_CACHE
+    _AUTH_KEYS_CACHE = None
+
+
+# The lazy reader below builds on plistlib's private binary parser; if a
+# Python release drops it, _extract_auth_keys just uses plistlib.loads()
+_LAZY_ARCHIVE = hasattr(plistlib, "_BinaryPlistParser") and hasattr(plistlib, "_undefined")
+_BinaryPlistParser = cast(type, getattr(plistlib, "_BinaryPlistParser", object))
+_UNDEFINED = getattr(plistlib, "_undefined", None)
+
+
+class _ArchiveObjects(_BinaryPlistParser):
+    """The $objects table of a binary NSKeyedArchiver plist, decoded on access.
+
+    plistlib.loads() materializes the whole object graph; the auth-key walk
+    only needs the root dictionary and the few entries it references.
+    """
+
+    def __init__(self, blob: bytes):
+        super().__init__(dict_type=dict)
+        if not blob.startswith(b"bplist"):
+            raise plistlib.InvalidFileException()
+        self._fp = io.BytesIO(blob)
+        self._fp.seek(-32, os.SEEK_END)
+        offset_size, self._ref_size, num_objects, top_object, offset_table_offset = (
+            struct.unpack(">6xBBQQQ", self._fp.read(32))
+        )
+        self._fp.seek(offset_table_offset)
+        self._object_offsets = self._read_ints(num_objects, offset_size)
+        self._objects = [_UNDEFINED] * num_objects
+
+        # Top level is {"$objects": [...], "$top": ..., ...}; find the array
+        # without decoding the other values
+        key_refs, value_refs = self._container_refs(top_object, 0xD0)
+        for key_ref, value_ref in zip(key_refs, value_refs):
+            if self._read_object(key_ref) == "$objects":
+                self._refs = self._container_refs(value_ref, 0xA0)[0]
+                break
+        else:
+            raise plistlib.InvalidFileException()
+
+    def _container_refs(self, ref: int, kind: int) -> tuple[tuple, tuple]:
+        """Child refs of an array (kind 0xA0) or dict (0xD0) without reading them."""
+        self._fp.seek(self._object_offsets[ref])
+        token = self._fp.read(1)[0]
+        if token & 0xF0 != kind:
+            raise plistlib.InvalidFileException()
+        size = self._get_size(token & 0x0F)
+        first = self._read_refs(size)
+        return first, (self._read_refs(size) if kind == 0xD0 else ())
+
+    def __getitem__(self, index: int):
+        ref = self._refs[index]
+        try:
+            return self._read_object(ref)
+        except (OSError, IndexError, struct.error, OverflowError, ValueError):
+            raise plistlib.InvalidFileException()
+
+
+def _decode_dc_id(blob: bytes) -> int | None:
+    """Decode the main DC id, stored as an archived NSNumber or a raw int32."""
+    try:
+        value = plistlib.loads(blob, fmt=plistlib.FMT_BINARY)
+        if isinstance(value, dict) and "$objects" in value:
+            value = value["$objects"][value["$top"]["root"]]
+    except Exception:
+        value = struct.unpack("<i", blob)[0] if len(blob) == 4 else None
+    return value if type(value) is int and value in _DC_ADDRESSES else None
+
+
+def _cached_auth_keys(state: tuple | None) -> tuple[int | None, dict[int, bytes]] | None:
+    if state and _AUTH_KEYS_CACHE is not None and _AUTH_KEYS_CACHE[0] == state:
+        return _AUTH_KEYS_CACHE[1]
+    return None
+
 
-def _extract_auth_keys() -> dict[int, bytes]:
+def _extract_auth_keys(db: TelegramDB | None = None) -> tuple[int | None, dict[int, bytes]]:
     """Extract persistent auth keys from the Telegram postbox t1 table.
 
-    Returns {dc_id: auth_key_bytes} for standard DCs (1-5) with persistent keys.
+    Returns (main_dc_id, {dc_id: auth_key_bytes}) for standard DCs (1-5) with
+    persistent keys; main_dc_id is None when the database doesn't record it.
+    The result is reused until the database files change. An open ``db``
+    is used as is and left open.
     """
-    from .telegram_db import TelegramDB
+    global _AUTH_KEYS_CACHE
+    tg = db if db is not None else TelegramDB()
+    state = _db_state(tg._db_path) if tg._db_path else None
+    cached = _cached_auth_keys(state)
+    if cached is not None:
+        return cached
 
-    tg = TelegramDB()
     tg._ensure_connection()
     conn = tg._conn
 
     row = conn.execute(
-        "SELECT value FROM t1 WHERE key = ?", (b"persistent:datacenterAuthInfoById",)
+        "SELECT value FROM t1 WHERE key = ?", (_AUTH_INFO_KEY,)
+    ).fetchone()
+    main_row = conn.execute(
+        "SELECT value FROM t1 WHERE key = ?", (b"persistent:mainDcId",)
     ).fetchone()
-    tg.close()
+    if db is None:
+        tg.close()
 
     if not row:
-        return {}
-
-    plist = plistlib.loads(row[0])
-    objects = plist["$objects"]
-
-    def resolve(uid):
-        return objects[uid] if isinstance(uid, plistlib.UID) else uid
-
+        return None, {}
+    main_dc = _decode_dc_id(main_row[0]) if main_row else None
+
+    objects = None
+    if _LAZY_ARCHIVE:
+        try:
+            objects = _ArchiveObjects(row[0])
+        except Exception:
+            pass
+    if objects is None:
+        objects = plistlib.loads(row[0], fmt=plistlib.FMT_BINARY)["$objects"]
+
+    # UID references are resolved inline; this loop runs once per archived DC
+    UID = plistlib.UID
     root = objects[1]
     results = {}
     for key_uid, val_uid in zip(root["NS.keys"], root["NS.objects"]):
-        dc_id = resolve(key_uid)
+        dc_id = objects[key_uid.data] if type(key_uid) is UID else key_uid
         if not isinstance(dc_id, int) or dc_id not in _DC_ADDRESSES:
             continue
 
-        info = resolve(val_uid)
+        info = objects[val_uid.data] if type(val_uid) is UID else val_uid
         if not isinstance(info, dict) or "authKey" not in info:
             continue
 
@@ -67,84 +195,364 @@ def _extract_auth_keys() -> dict[int, bytes]:
         if info.get("validUntilTimestamp", 0) != 0:
             continue
 
-        auth_key_obj = resolve(info["authKey"])
+        auth_key_obj = info["authKey"]
+        if type(auth_key_obj) is UID:
+            auth_key_obj = objects[auth_key_obj.data]
         auth_key_bytes = auth_key_obj.get("NS.data", b"") if isinstance(auth_key_obj, dict) else b""
         if len(auth_key_bytes) == 256:
             results[dc_id] = auth_key_bytes
 
-    return results
+    if state:
+        _AUTH_KEYS_CACHE = (state, (main_dc, results))
+    return main_dc, results
 
 
-async def _get_client() -> TelegramClient:
-    """Create a TelegramClient using the auth key from the local Telegram database."""
-    keys = _extract_auth_keys()
+def _new_client(dc_id: int, auth_key: bytes) -> TelegramClient:
+    from telethon import TelegramClient
+    from telethon.crypto import AuthKey
+    from telethon.sessions import MemorySession
+
+    session = MemorySession()
+    ip = _DC_ADDRESSES[dc_id]
+    session.set_dc(dc_id, ip, 443)
+    # Fresh per client: Telethon replaces AuthKey.key in place on DC migration
+    session.auth_key = AuthKey(auth_key)
+
+    client = TelegramClient(session, _API_ID, _API_HASH)
+    client.session.set_dc(dc_id, ip, 443)
+    return client
+
+
+def _load_last_dc() -> int | None:
+    try:
+        with open(_LAST_DC_PATH) as f:
+            dc_id = json.load(f)["dc"]
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    return dc_id if type(dc_id) is int else None
+
+
+def _save_last_dc(dc_id: int) -> None:
+    try:
+        _LAST_DC_PATH.parent.mkdir(parents=True, exist_ok=True)
+        tmp = _LAST_DC_PATH.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump({"dc": dc_id}, f)
+        os.replace(tmp, _LAST_DC_PATH)
+    except OSError:
+        pass
+
+
+async def _try_dc(dc_id: int, auth_key: bytes) -> TelegramClient | None:
+    """Connect with one DC's key; return the client if it is authorized."""
+    client = _new_client(dc_id, auth_key)
+    authorized = False
+    try:
+        await client.connect()
+        authorized = await client.is_user_authorized()
+    except Exception:
+        # e.g. AuthKeyNotFound for a key the server dropped; one bad DC
+        # must not abort the others (cancellation still propagates)
+        pass
+    finally:
+        if not authorized:
+            await client.disconnect()
+    return client if authorized else None
+
+
+def _require_auth_keys(db: TelegramDB | None = None) -> tuple[int | None, dict[int, bytes]]:
+    """_extract_auth_keys(), raising if no standard DC has a persistent key."""
+    main_dc, keys = _extract_auth_keys(db)
     if not keys:
         raise RuntimeError(
             "No Telegram auth keys found. Is Telegram installed and logged in?"
         )
+    return main_dc, keys
 
-    # Try each DC's persistent key until one is authorized
-    for dc_id in (2, 1, 4, 5, 3):
-        if dc_id not in keys:
-            continue
-
-        session = MemorySession()
-        ip = _DC_ADDRESSES[dc_id]
-        session.set_dc(dc_id, ip, 443)
-        session.auth_key = AuthKey(keys[dc_id])
-
-        client = TelegramClient(session, _API_ID, _API_HASH)
-        client.session.set_dc(dc_id, ip, 443)
-        await client.connect()
 
-        if await client.is_user_authorized():
+async def _get_client(db: TelegramDB | None = None) -> TelegramClient:
+    """Create a TelegramClient using the auth key from the local Telegram database."""
+    main_dc, keys = _require_auth_keys(db)
+
+    # The account's home DC is authorized by definition; an auth problem
+    # would surface on the first real request anyway
+    if main_dc in keys:
+        client = _new_client(main_dc, keys[main_dc])
+        try:
+            await client.connect()
+            return client
+        except OSError:
+            pass
+
+    # Without a usable mainDcId, the last probe's winner is the best bet
+    last_dc = _load_last_dc()
+    if last_dc in keys and last_dc != main_dc:
+        client = await _try_dc(last_dc, keys[last_dc])
+        if client is not None:
             return client
 
-        await client.disconnect()
-
+    # Probe the remaining DCs concurrently; the first authorized one wins
+    probes = {
+        asyncio.ensure_future(_try_dc(dc_id, keys[dc_id])): dc_id
+        for dc_id in (2, 1, 4, 5, 3)
+        if dc_id in keys and dc_id not in (main_dc, last_dc)
+    }
+    pending = set(probes)
+    client = None
+    try:
+        while pending and client is None:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                authorized = task.result()
+                if authorized is None:
+                    continue
+                if client is None:
+                    client = authorized
+                    _save_last_dc(probes[task])
+                else:
+                    await authorized.disconnect()
+    finally:
+        for task in pending:
+            task.cancel()
+        for late in await asyncio.gather(*pending, return_exceptions=True):
+            # A probe can finish between asyncio.wait() and cancel()
+            if late is not None and not isinstance(late, BaseException):
+                await late.disconnect()
+
+    if client is not None:
+        return client
     raise RuntimeError(
         "Telegram auth keys found but none are authorized. "
         "Try logging out and back into Telegram.app."
     )
 
 
-def is_available() -> bool:
-    """Check if we can extract auth keys from the local Telegram database."""
-    return bool(_extract_auth_keys())
+async def _acquire_client(db: TelegramDB | None = None) -> TelegramClient:
+    """Return the shared client, connecting it on first use or after a drop."""
+    global _client, _client_loop
+    async with _client_lock:
+        if _client is None:
+            _client = await _get_client(db)
+            if _client_loop is None:
+                atexit.register(_disconnect_at_exit)
+            _client_loop = asyncio.get_running_loop()
+        elif not _client.is_connected():
+            await _client.connect()
+        return _client
+
+
+async def close() -> None:
+    """Disconnect the shared client, if any."""
+    global _client
+    async with _client_lock:
+        if _client is not None:
+            client, _client = _client, None
+            await client.disconnect()
+
+
+def _disconnect_at_exit() -> None:
+    # Registered after the loop's own close hook, so atexit runs this first
+    loop = _client_loop
+    if _client is not None and loop is not None and not loop.is_closed():
+        loop.run_until_complete(close())
+
+
+def is_logged_in(db: TelegramDB | None = None) -> bool:
+    """Check if the local Telegram database holds datacenter auth info.
+
+    Only probes for the row; the archive is parsed when actually sending.
+    """
+    tg = db if db is not None else TelegramDB()
+    cached = _cached_auth_keys(_db_state(tg._db_path) if tg._db_path else None)
+    if cached is not None:
+        return bool(cached[1])
+
+    tg._ensure_connection()
+    row = tg._conn.execute(
+        "SELECT 1 FROM t1 WHERE key = ? LIMIT 1", (_AUTH_INFO_KEY,)
+    ).fetchone()
+    if db is None:
+        tg.close()
+    return row is not None
 
 
-def _resolve_entity_hint(peer_id: int) -> str | None:
+def _resolve_entity_hint(peer_id: int, db: TelegramDB | None = None) -> str | None:
     """Get a phone number or username for a peer from the local DB.
 
     Telethon can't resolve raw peer_ids without an access_hash cache,
     so we look up a phone or username to use as the entity identifier.
     """
-    from .telegram_db import TelegramDB
+    hint = _HINT_CACHE.get(peer_id)
+    if hint is not None:
+        return hint
 
-    tdb = TelegramDB()
-    peer = tdb._get_peer(peer_id)
-    tdb.close()
+    if db is not None:
+        peer = db._get_peer(peer_id)
+    else:
+        tdb = TelegramDB()
+        peer = tdb._get_peer(peer_id)
+        tdb.close()
 
     if peer.get("phone"):
         phone = peer["phone"]
-        return phone if phone.startswith("+") else f"+{phone}"
-    if peer.get("username"):
-        return f"@{peer['username']}"
-    return None
+        hint = phone if phone.startswith("+") else f"+{phone}"
+    elif peer.get("username"):
+        hint = f"@{peer['username']}"
+    else:
+        return None
+    _HINT_CACHE[peer_id] = hint
+    return hint
 
 
-async def send_message(peer_id: int, text: str) -> str:
+async def send_message(peer_id: int, text: str, db: TelegramDB | None = None) -> str:
     """Send a message to a Telegram peer. Returns confirmation string."""
-    hint = _resolve_entity_hint(peer_id)
-    if not hint:
-        raise RuntimeError(
-            f"Cannot send to peer {peer_id}: no phone number or username found."
-        )
+    return (await send_messages([(peer_id, text)], db))[0]
+
+
+def _entity_cache_path(db: TelegramDB) -> Path:
+    account = _account_tag(db._db_path) if db._db_path else "default"
+    return _ENTITY_CACHE_DIR / f"entities-{account}.json"
+
+
+def _load_entity_cache(path: Path) -> dict[int, list]:
+    cache = _entity_caches.get(path)
+    if cache is None:
+        try:
+            with open(path) as f:
+                cache = {int(k): v for k, v in json.load(f).items()}
+        except (OSError, ValueError, AttributeError):
+            cache = {}
+        _entity_caches[path] = cache
+    return cache
+
 
-    client = await _get_client()
+def _save_entity_cache(path: Path) -> None:
     try:
-        entity = await client.get_entity(hint)
-        await client.send_message(entity, text)
-        return "Message sent."
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump(_load_entity_cache(path), f)
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+
+def _cached_input_peer(peer_id: int, cache_path: Path):
+    entry = _load_entity_cache(cache_path).get(peer_id)
+    if not entry:
+        return None
+    from telethon.tl.types import InputPeerChannel, InputPeerChat, InputPeerUser
+
+    kind, *args = entry
+    if kind == "user":
+        return InputPeerUser(*args)
+    if kind == "chat":
+        return InputPeerChat(*args)
+    if kind == "channel":
+        return InputPeerChannel(*args)
+    return None
+
+
+async def _lookup_input_peer(
+    client: TelegramClient, peer_id: int, hint: str, cache_path: Path
+):
+    """Resolve a hint over the network and remember the result for peer_id."""
+    from telethon.tl.types import InputPeerChannel, InputPeerChat, InputPeerUser
+
+    peer = await client.get_input_entity(hint)
+    if isinstance(peer, InputPeerUser):
+        entry = ["user", peer.user_id, peer.access_hash]
+    elif isinstance(peer, InputPeerChannel):
+        entry = ["channel", peer.channel_id, peer.access_hash]
+    elif isinstance(peer, InputPeerChat):
+        entry = ["chat", peer.chat_id]
+    else:
+        entry = None
+    cache = _load_entity_cache(cache_path)
+    if entry != cache.get(peer_id):
+        if entry:
+            cache[peer_id] = entry
+        else:
+            cache.pop(peer_id, None)
+        _save_entity_cache(cache_path)
+    return peer
+
+
+async def send_messages(
+    items: list[tuple[int, str]], db: TelegramDB | None = None
+) -> list[str]:
+    """Send (peer_id, text) pairs over one connection.
+
+    Different chats are sent to concurrently; messages to the same chat keep
+    their order. Returns one confirmation string per item. Peer and auth key
+    lookups share ``db`` if given, or one TelegramDB opened for the call.
+    """
+    own_db = db is None
+    if own_db:
+        db = TelegramDB()
+    try:
+        # No point resolving peers if there is nothing to connect with
+        if _client is None:
+            _require_auth_keys(db)
+
+        hints: dict[int, str] = {}
+        texts_by_peer: dict[int, list[str]] = {}
+        for peer_id, text in items:
+            if peer_id not in hints:
+                hint = _resolve_entity_hint(peer_id, db)
+                if not hint:
+                    raise RuntimeError(
+                        f"Cannot send to peer {peer_id}: no phone number or username found."
+                    )
+                hints[peer_id] = hint
+            texts_by_peer.setdefault(peer_id, []).append(text)
+
+        cache_path = _entity_cache_path(db)
+        client = await _acquire_client(db)
     finally:
-        await client.disconnect()
+        if own_db:
+            db.close()
+
+    from telethon.errors import (
+        ChannelInvalidError,
+        ChannelPrivateError,
+        ChatIdInvalidError,
+        PeerIdInvalidError,
+        UserIdInvalidError,
+    )
+
+    # What a cached peer that no longer resolves (stale, or from another
+    # account) fails with
+    stale_peer_errors = (
+        PeerIdInvalidError,
+        ChannelInvalidError,
+        ChannelPrivateError,
+        ChatIdInvalidError,
+        UserIdInvalidError,
+    )
+
+    # Stay well under Telegram's flood limits
+    limit = asyncio.Semaphore(_SEND_CONCURRENCY)
+
+    async def send_chat(peer_id: int, texts: list[str]):
+        peer = _cached_input_peer(peer_id, cache_path)
+        from_cache = peer is not None
+        if peer is None:
+            async with limit:
+                peer = await _lookup_input_peer(client, peer_id, hints[peer_id], cache_path)
+        for text in texts:
+            async with limit:
+                try:
+                    await client.send_message(peer, text)
+                except stale_peer_errors:
+                    if not from_cache:
+                        raise
+                    # Stale cache entry: resolve again and retry once
+                    peer = await _lookup_input_peer(client, peer_id, hints[peer_id], cache_path)
+                    from_cache = False
+                    await client.send_message(peer, text)
+
+    await asyncio.gather(*(send_chat(p, t) for p, t in texts_by_peer.items()))
+    return ["Message sent."] * len(items)
@@ -1,5 +1,6 @@
 """Shared utilities for messages-cli."""
 
+import functools
 from datetime import datetime
 from pathlib import Path
 
@@ -9,9 +10,17 @@ WHATSAPP_SESSION_DIR = Path.home() / ".whatsapp-cli"
 
 def format_phone(value: str) -> str:
     """Format a phone number by country code."""
-    import phonenumbers
     if not value:
         return value
+    return _format_phone(value)
+
+
+@functools.lru_cache(maxsize=8192)
+def _format_phone(value: str) -> str:
+    # Emails, group chat IDs and plain names never parse; skip phonenumbers
+    if "@" in value or value.startswith("chat") or not any(c.isdigit() for c in value):
+        return value
+    import phonenumbers
     to_parse = value if value.startswith("+") else f"+{value}"
     try:
         parsed = phonenumbers.parse(to_parse)
@@ -22,10 +31,21 @@ def format_phone(value: str) -> str:
         return value
 
 
+def format_phones(values) -> dict[str, str]:
+    """Format many phone numbers, parsing each distinct value once."""
+    return {v: format_phone(v) for v in set(values)}
+
+
 def format_ts(unix_ts: int | float | None) -> str:
     """Format unix timestamp as ISO 8601 with local timezone."""
     if unix_ts is None:
         return ""
+    return _format_ts(unix_ts)
+
+
+@functools.lru_cache(maxsize=4096)
+def _format_ts(unix_ts: int | float) -> str:
+    # Album items, edits and chat lists repeat the same second often
     return datetime.fromtimestamp(unix_ts).astimezone().isoformat()
 
 